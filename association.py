@@ -0,0 +1,85 @@
+import numpy as np
+from typing import List, Optional, Sequence
+
+def as_boxes(boxes) -> np.ndarray:
+    """Convert a box or a sequence of boxes to an (N, 4) float32 array.
+
+    Args:
+        boxes: (N, 4) array, list of [x1, y1, x2, y2] or a single box
+
+    Returns:
+        np.ndarray: (N, 4) boxes [x1, y1, x2, y2]
+    """
+    return np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+
+def box_centers(boxes) -> np.ndarray:
+    """Get the (N, 2) centers of (N, 4) boxes."""
+    boxes = as_boxes(boxes)
+    return (boxes[:, :2] + boxes[:, 2:]) / 2
+
+def pairwise_iou(boxes_a, boxes_b) -> np.ndarray:
+    """Calculate the IoU of every box in boxes_a against every box in boxes_b.
+
+    Args:
+        boxes_a: (N, 4) boxes [x1, y1, x2, y2]
+        boxes_b: (M, 4) boxes [x1, y1, x2, y2]
+
+    Returns:
+        np.ndarray: (N, M) IoU matrix
+    """
+    a = as_boxes(boxes_a)[:, None, :]
+    b = as_boxes(boxes_b)[None, :, :]
+    # Intersection rectangles for all pairs at once
+    inter_w = np.clip(np.minimum(a[..., 2], b[..., 2]) - np.maximum(a[..., 0], b[..., 0]), 0, None)
+    inter_h = np.clip(np.minimum(a[..., 3], b[..., 3]) - np.maximum(a[..., 1], b[..., 1]), 0, None)
+    intersection = inter_w * inter_h
+    area_a = (a[..., 2] - a[..., 0]) * (a[..., 3] - a[..., 1])
+    area_b = (b[..., 2] - b[..., 0]) * (b[..., 3] - b[..., 1])
+    union = area_a + area_b - intersection
+    return np.divide(intersection, union, out=np.zeros_like(intersection), where=union > 0)
+
+def pairwise_center_distances(boxes_a, boxes_b) -> np.ndarray:
+    """Calculate squared center distances between every box in boxes_a and boxes_b.
+
+    Returns:
+        np.ndarray: (N, M) squared euclidean distances
+    """
+    diff = box_centers(boxes_a)[:, None, :] - box_centers(boxes_b)[None, :, :]
+    return np.einsum('nmk,nmk->nm', diff, diff)
+
+def nearest_k(boxes, target_box, k: int) -> np.ndarray:
+    """Find the k boxes whose centers are closest to the center of target_box.
+
+    Uses argpartition, so only the k winners are sorted rather than all N boxes.
+
+    Args:
+        boxes: (N, 4) candidate boxes
+        target_box: Box [x1, y1, x2, y2] to measure from (e.g. the ball)
+        k (int): Number of boxes to return
+
+    Returns:
+        np.ndarray: Indices of up to k boxes, closest first
+    """
+    dists = pairwise_center_distances(boxes, target_box)[:, 0]
+    k = min(k, len(dists))
+    if k == 0:
+        return np.empty(0, dtype=np.int64)
+    candidates = np.argpartition(dists, k - 1)[:k]
+    # Ties keep input order, like a stable sort over all boxes would
+    return candidates[np.lexsort((candidates, dists[candidates]))]
+
+def closest_tracks(tracks: List[dict], target_box: Optional[Sequence[float]], k: int) -> List[dict]:
+    """Get the k tracks closest to target_box, closest first.
+
+    Args:
+        tracks (list): Tracked players, each with a 'bbox'
+        target_box (list): Box to measure from, or None
+        k (int): Number of tracks to return
+
+    Returns:
+        list: Up to k tracks
+    """
+    if target_box is None or not tracks:
+        return []
+    boxes = as_boxes([track['bbox'] for track in tracks])
+    return [tracks[i] for i in nearest_k(boxes, target_box, k)]
@@ -0,0 +1,114 @@
+import argparse
+import os
+import sys
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+import pandas as pd
+from event_processor import add_processing_arguments, processing_options
+
+def read_manifest(manifest_csv):
+    """Read a batch manifest of match jobs.
+
+    The manifest has video, events and output columns, one match per row.
+    Relative paths are resolved against the manifest's directory.
+
+    Returns:
+        list: (video, events, output, event count) tuples, longest job first
+    """
+    manifest = pd.read_csv(manifest_csv)
+    missing = {'video', 'events', 'output'} - set(manifest.columns)
+    if missing:
+        raise ValueError(f"Manifest {manifest_csv} is missing columns: {sorted(missing)}")
+    base = os.path.dirname(os.path.abspath(manifest_csv))
+    jobs = []
+    for _, row in manifest.iterrows():
+        video, events, output = (os.path.join(base, str(row[column])) for column in ('video', 'events', 'output'))
+        count = len(pd.read_csv(events)) if os.path.exists(events) else 0
+        jobs.append((video, events, output, count))
+    # Longest first, so one long match is not left running alone at the end
+    jobs.sort(key=lambda job: job[3], reverse=True)
+    return jobs
+
+def _init_worker(threads, predictor_options):
+    # Thread budget before torch is imported, then load every model once for all jobs of this worker
+    os.environ['OMP_NUM_THREADS'] = str(threads)
+    os.environ['MKL_NUM_THREADS'] = str(threads)
+    from predictor import configure, warm_up_models
+    configure(**predictor_options)
+    warm_up_models(background=False)
+
+def _run_job(args):
+    video, events, output, options = args
+    from event_processor import process_events
+    import cv2
+    # process_events writes rows without players for an unreadable video; in a
+    # batch that is a failed job, left without output so a rerun retries it
+    cap = cv2.VideoCapture(video)
+    opened = cap.isOpened()
+    cap.release()
+    if not opened:
+        raise RuntimeError(f"could not open video {video}")
+    # Models are already loaded by the worker initializer; tracks and votes are reset per video
+    process_events(events, video, output, warm_up=False, resume=True, **options)
+    return output
+
+def run_batch(manifest_csv, workers=1, predictor_options=None, **options):
+    """Process every match of a manifest across long-lived worker processes.
+
+    Each worker loads the models once and then takes jobs, longest first, until
+    none are left. Every finished event is appended to a '<output>.partial'
+    checkpoint, and an output is only written once its match is complete, so
+    rerunning the same manifest after a crash skips finished matches and
+    finished events.
+
+    Args:
+        manifest_csv (str): Manifest with video, events and output columns
+        workers (int): Worker processes, i.e. matches processed at once
+        predictor_options (dict): Passed to predictor.configure() in every worker
+        **options: Further process_events arguments for every job, e.g. window,
+            pipeline, stream_windows, detect_workers or stage_timings
+
+    Returns:
+        list: (output, error message) for every job that failed
+    """
+    jobs = read_manifest(manifest_csv)
+    pending = [job for job in jobs if not os.path.exists(job[2])]
+    if len(pending) < len(jobs):
+        print(f"Skipping {len(jobs) - len(pending)} of {len(jobs)} matches with finished outputs")
+    if not pending:
+        return []
+    workers = max(1, min(workers, len(pending)))
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    options = dict(options, predictor_options=predictor_options)
+    failures = []
+    with ProcessPoolExecutor(max_workers=workers, mp_context=mp.get_context('spawn'),
+                             initializer=_init_worker, initargs=(threads, predictor_options or {})) as pool:
+        # Submitted in order, so free workers always pick up the longest job left
+        futures = {pool.submit(_run_job, (video, events, output, options)): output
+                   for video, events, output, _ in pending}
+        for future in as_completed(futures):
+            output = futures[future]
+            try:
+                future.result()
+                print(f"Finished {output}")
+            except BrokenProcessPool:
+                # A worker died (e.g. out of memory); checkpoints let a rerun continue
+                failures.append((output, 'worker process died'))
+            except Exception as e:
+                failures.append((output, f'{type(e).__name__}: {e}'))
+                print(f"Error processing {output}: {e}")
+    return failures
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Attribute events for many matches listed in a manifest CSV")
+    parser.add_argument("manifest", help="CSV with video, events and output columns, one match per row")
+    parser.add_argument("--workers", type=int, default=1, help="Matches processed at once, each in its own process")
+    add_processing_arguments(parser)
+    args = parser.parse_args()
+    failures = run_batch(args.manifest, args.workers, **processing_options(parser, args))
+    for output, error in failures:
+        print(f"FAILED {output}: {error}")
+    if failures:
+        print("Rerun the same command to resume; finished events are kept in each output's .partial file")
+        sys.exit(1)
@@ -0,0 +1,254 @@
+import argparse
+import json
+import os
+import resource
+import sys
+import time
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+from synthetic_match import simulate_match, render_match, write_events
+
+STAGES = ('frame_access', 'detect', 'keyframes', 'track', 'track_bytetrack', 'association', 'ocr_preprocess', 'end_to_end')
+
+def _peak_rss_mb():
+    # ru_maxrss is in KiB on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+def _event_rows(eval_csv):
+    from video_utils import parse_timestamp
+    events = pd.read_csv(eval_csv)
+    return sorted(parse_timestamp(ts) for ts in events['timestamp'])
+
+def bench_frame_access(workdir, match, frames):
+    # Decode every event window in timestamp order through one reader
+    from video_utils import VideoFrameReader, window_bounds
+    timestamps = _event_rows(os.path.join(workdir, 'eval.csv'))
+    reader = VideoFrameReader(os.path.join(workdir, 'match.mp4'))
+    start_time = time.perf_counter()
+    decoded = 0
+    for timestamp in timestamps:
+        start, end = window_bounds(timestamp, reader.fps)
+        decoded += len(reader.read_window(start, end))
+    seconds = time.perf_counter() - start_time
+    reader.release()
+    return {'seconds': seconds, 'frames': decoded, 'events': len(timestamps)}
+
+def _read_frames(workdir, count):
+    from video_utils import VideoFrameReader
+    reader = VideoFrameReader(os.path.join(workdir, 'match.mp4'))
+    frames = reader.read_window(0, count - 1)
+    reader.release()
+    return frames
+
+def bench_detect(workdir, match, frames):
+    from detection import PlayerDetector
+    images = _read_frames(workdir, frames)
+    detector = PlayerDetector()
+    detector.detect(images[0])  # First call pays for lazy initialisation
+    start_time = time.perf_counter()
+    for image in images:
+        detector.detect(image)
+    return {'seconds': time.perf_counter() - start_time, 'frames': len(images)}
+
+def bench_keyframes(workdir, match, frames, intervals=(3, 5, 10), radius=20):
+    # Accuracy cost of --detect-every: ground-truth boxes stand in for a perfect
+    # detector on the frames that are detected, so only what keyframing, optical
+    # flow and ball interpolation lose is measured, over a window around every kick
+    import numpy as np
+    from detection import PlayerDetector, split_detections
+    from association import pairwise_iou
+    from localization import localize_contacts
+    from video_utils import VideoFrameReader
+    truth = {}
+    detector = PlayerDetector(infer=lambda batch, imgsz: [truth[id(image)] for image in batch])
+    reader = VideoFrameReader(os.path.join(workdir, 'match.mp4'), cache_size=0)
+    stats = {interval: {'detected': 0, 'ious': [], 'errors': [], 'missing': 0, 'kicks': 0} for interval in intervals}
+    total, seconds = 0, 0.0
+    for kick, _, _ in match['passes']:
+        start, end = max(0, kick - radius), min(len(match['ball_boxes']) - 1, kick + radius)
+        images = reader.read_window(start, end)
+        truth.clear()
+        for offset, image in enumerate(images):
+            boxes = match['player_boxes'][start + offset]
+            players = np.concatenate([boxes, np.tile([[0.9, 0]], (len(boxes), 1))], axis=1)
+            ball = np.concatenate([match['ball_boxes'][start + offset], [0.8, 32]])[None]
+            truth[id(image)] = np.concatenate([players, ball]).astype(np.float32)
+        total += len(images)
+        for interval, stat in stats.items():
+            detector.inferred_frames = 0
+            start_time = time.perf_counter()
+            detections = detector.detect_sparse(images, None, interval)
+            seconds += time.perf_counter() - start_time
+            stat['detected'] += detector.inferred_frames
+            ball_boxes = []
+            for offset, dets in enumerate(detections):
+                players, ball = split_detections(dets)
+                iou = pairwise_iou(match['player_boxes'][start + offset], players)
+                stat['ious'].append(iou.max(axis=1).mean() if iou.size else 0.0)
+                ball_boxes.append(None if ball is None else ball.tolist())
+                if ball is None:
+                    stat['missing'] += 1
+                else:
+                    true_ball = match['ball_boxes'][start + offset]
+                    stat['errors'].append(np.linalg.norm((ball[:2] + ball[2:]) / 2 - (true_ball[:2] + true_ball[2:]) / 2))
+            contact = localize_contacts(ball_boxes, kick - start)
+            stat['kicks'] += contact is not None and abs(contact[0] - (kick - start)) <= 2
+    reader.release()
+    result = {'seconds': seconds, 'frames': total * len(intervals)}
+    for interval, stat in stats.items():
+        result[f'every_{interval}'] = {
+            'detected_share': round(stat['detected'] / total, 3),
+            'player_iou': round(float(np.mean(stat['ious'])), 3),
+            'ball_error_px': round(float(np.mean(stat['errors'])), 1) if stat['errors'] else None,
+            'ball_missing_share': round(stat['missing'] / total, 3),
+            'kicks_within_2_frames': f"{stat['kicks']}/{len(match['passes'])}"}
+    return result
+
+def bench_track(workdir, match, frames, backend='norfair'):
+    # Ground-truth boxes as detections, so only the tracker itself is timed
+    from tracking import PlayerTracker
+    tracker = PlayerTracker(backend=backend)
+    detections = [[{'bbox': box.tolist(), 'confidence': 0.9, 'class': 0} for box in boxes]
+                  for boxes in match['player_boxes'][:frames]]
+    start_time = time.perf_counter()
+    for frame_idx, frame_detections in enumerate(detections):
+        tracker.update(frame_detections, frame_idx)
+    return {'seconds': time.perf_counter() - start_time, 'frames': len(detections)}
+
+def bench_track_bytetrack(workdir, match, frames):
+    return bench_track(workdir, match, frames, backend='bytetrack')
+
+def bench_association(workdir, match, frames):
+    # Nearest players to the ball plus the full IoU matrix, once per frame
+    from association import closest_tracks, pairwise_iou
+    tracks = [[{'bbox': box.tolist(), 'id': i, 'confidence': 0.9} for i, box in enumerate(boxes)]
+              for boxes in match['player_boxes'][:frames]]
+    balls = match['ball_boxes'][:frames].tolist()
+    start_time = time.perf_counter()
+    for frame_tracks, ball, boxes in zip(tracks, balls, match['player_boxes']):
+        closest_tracks(frame_tracks, ball, 2)
+        pairwise_iou(boxes, boxes)
+    return {'seconds': time.perf_counter() - start_time, 'frames': len(tracks)}
+
+def bench_ocr_preprocess(workdir, match, frames):
+    # Crop/resize/convert every player of every frame into an OCR batch
+    from ocr import prepare_crop_batch
+    images = _read_frames(workdir, frames)
+    buffer = None
+    start_time = time.perf_counter()
+    crops = 0
+    for image, boxes in zip(images, match['player_boxes']):
+        buffer, valid = prepare_crop_batch([(image, box) for box in boxes], buffer)
+        crops += len(valid)
+    return {'seconds': time.perf_counter() - start_time, 'frames': len(images), 'crops': crops}
+
+def bench_end_to_end(workdir, match, frames):
+    from event_processor import process_events
+    output = os.path.join(workdir, 'submission.csv')
+    eval_csv = os.path.join(workdir, 'eval.csv')
+    start_time = time.perf_counter()
+    # No detection cache, so every run does the same work
+    process_events(eval_csv, os.path.join(workdir, 'match.mp4'), output, detection_cache_dir=None)
+    seconds = time.perf_counter() - start_time
+    return {'seconds': seconds, 'events': len(pd.read_csv(eval_csv))}
+
+def _run_stage(args):
+    # Runs in a fresh process so peak RSS belongs to this stage alone
+    stage, workdir, match, frames = args
+    try:
+        result = globals()[f'bench_{stage}'](workdir, match, frames)
+    except ImportError as e:
+        return {'skipped': f'missing dependency: {e.name}'}
+    result['peak_rss_mb'] = _peak_rss_mb()
+    if result.get('frames'):
+        result['frames_per_s'] = round(result['frames'] / result['seconds'], 1)
+    if result.get('events'):
+        result['events_per_s'] = round(result['events'] / result['seconds'], 2)
+    result['seconds'] = round(result['seconds'], 3)
+    return result
+
+def run_benchmarks(workdir, stages=STAGES, seconds=30, players=22, fps=20, size=(1280, 720), frames=200, seed=0):
+    """Generate a synthetic match in workdir and benchmark each stage in its own process.
+
+    Args:
+        workdir (str): Directory for the synthetic video, eval.csv and outputs
+        stages (tuple): Stages to run, see STAGES
+        seconds, players, fps, size, seed: Synthetic match parameters (see simulate_match)
+        frames (int): Frames used by the per-frame stage benchmarks
+
+    Returns:
+        dict: Per stage: seconds, frames/events processed, frames_per_s and/or
+            events_per_s, and peak_rss_mb; or {'skipped': reason}
+    """
+    os.makedirs(workdir, exist_ok=True)
+    match = simulate_match(seconds, fps, size, players, seed=seed)
+    video_path = os.path.join(workdir, 'match.mp4')
+    render_match(match, video_path, seed=seed)
+    write_events(match, os.path.join(workdir, 'eval.csv'), os.path.join(workdir, 'truth.csv'))
+    frames = min(frames, len(match['ball_boxes']))
+    results = {}
+    for stage in stages:
+        with ProcessPoolExecutor(max_workers=1, mp_context=mp.get_context('spawn')) as pool:
+            results[stage] = pool.submit(_run_stage, (stage, workdir, match, frames)).result()
+        print(f"{stage:>15}: {_describe(results[stage])}")
+    return results
+
+def _describe(result):
+    if 'skipped' in result:
+        return f"skipped ({result['skipped']})"
+    rates = [f"{result[key]} {key.replace('_per_s', '')}/s" for key in ('events_per_s', 'frames_per_s') if key in result]
+    accuracy = [f"{key}: {', '.join(f'{name} {value}' for name, value in values.items())}"
+                for key, values in result.items() if key.startswith('every_')]
+    return ', '.join(rates + [f"peak RSS {result['peak_rss_mb']} MB"] + accuracy)
+
+def compare_to_baseline(results, baseline, tolerance=0.15):
+    """List regressions against a baseline produced by --save-baseline.
+
+    A stage regresses when a throughput is more than `tolerance` below the
+    baseline or its peak RSS more than `tolerance` above it. Stages skipped in
+    either run are not compared.
+
+    Returns:
+        list: Human-readable regression descriptions (empty when none)
+    """
+    regressions = []
+    for stage, result in results.items():
+        reference = baseline.get(stage)
+        if not reference or 'skipped' in result or 'skipped' in reference:
+            continue
+        for key in ('events_per_s', 'frames_per_s'):
+            if key in result and key in reference and result[key] < reference[key] * (1 - tolerance):
+                regressions.append(f"{stage}: {key} {result[key]} < baseline {reference[key]}")
+        if result['peak_rss_mb'] > reference['peak_rss_mb'] * (1 + tolerance):
+            regressions.append(f"{stage}: peak_rss_mb {result['peak_rss_mb']} > baseline {reference['peak_rss_mb']}")
+    return regressions
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the pipeline on a synthetic match")
+    parser.add_argument("--workdir", default="bench", help="Where the synthetic clip and results are written")
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=list(STAGES))
+    parser.add_argument("--seconds", type=float, default=30, help="Synthetic clip length")
+    parser.add_argument("--players", type=int, default=22)
+    parser.add_argument("--frames", type=int, default=200, help="Frames used by per-frame stage benchmarks")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--baseline", help="Baseline JSON to compare against; exits with status 1 on a regression")
+    parser.add_argument("--save-baseline", help="Write this run's results as a new baseline JSON")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="Allowed relative slowdown or memory growth")
+    args = parser.parse_args()
+    results = run_benchmarks(args.workdir, args.stages, args.seconds, args.players, frames=args.frames, seed=args.seed)
+    with open(os.path.join(args.workdir, 'results.json'), 'w') as f:
+        json.dump(results, f, indent=2)
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline written to {args.save_baseline}")
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare_to_baseline(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+        print("No regressions against baseline")
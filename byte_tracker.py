@@ -0,0 +1,176 @@
+import numpy as np
+from association import as_boxes, pairwise_iou
+
+# Constant-velocity model over [cx, cy, w, h] and their velocities
+_F = np.eye(8, dtype=np.float64)
+_F[:4, 4:] = np.eye(4)
+# Process and measurement noise scale with the box height, as in ByteTrack/DeepSORT
+_STD_POSITION = 1 / 20
+_STD_VELOCITY = 1 / 160
+
+def _to_xywh(boxes):
+    boxes = as_boxes(boxes).astype(np.float64)
+    return np.concatenate([(boxes[:, :2] + boxes[:, 2:]) / 2, boxes[:, 2:] - boxes[:, :2]], axis=1)
+
+def _to_xyxy(xywh):
+    half = xywh[:, 2:4] / 2
+    return np.concatenate([xywh[:, :2] - half, xywh[:, :2] + half], axis=1)
+
+def linear_assignment(cost, max_cost):
+    """Match rows to columns of a cost matrix, minimising the total cost.
+
+    Uses scipy's Hungarian solver when available and a greedy lowest-cost-first
+    match otherwise. Pairs costing more than max_cost are never matched.
+
+    Returns:
+        tuple: (rows, cols) index arrays of the matched pairs
+    """
+    if cost.size == 0:
+        return np.empty(0, dtype=int), np.empty(0, dtype=int)
+    try:
+        from scipy.optimize import linear_sum_assignment
+    except ImportError:
+        linear_sum_assignment = None
+    if linear_sum_assignment is not None:
+        # Forbidden pairs get a cost no valid match can reach, then are dropped
+        rows, cols = linear_sum_assignment(np.where(cost > max_cost, max_cost + 1e4, cost))
+        keep = cost[rows, cols] <= max_cost
+        return rows[keep], cols[keep]
+    order = np.argsort(cost, axis=None)
+    used_rows, used_cols, rows, cols = set(), set(), [], []
+    for flat in order:
+        row, col = divmod(int(flat), cost.shape[1])
+        if cost[row, col] > max_cost:
+            break
+        if row not in used_rows and col not in used_cols:
+            used_rows.add(row)
+            used_cols.add(col)
+            rows.append(row)
+            cols.append(col)
+    return np.array(rows, dtype=int), np.array(cols, dtype=int)
+
+class ByteTracker:
+    def __init__(self, high_threshold=0.5, low_threshold=0.1, new_track_threshold=0.5,
+                 match_iou=0.2, low_match_iou=0.5, max_lost=30):
+        """Multi-object tracker in the style of ByteTrack, with all track state in arrays.
+
+        Every track is a Kalman filter over its box centre, width, height and
+        their velocities; predict and update run on all tracks at once. Each
+        frame, confident detections are matched to all tracks by IoU, then the
+        low-confidence detections (occluded or blurred players, boxes carried by
+        optical flow) are matched to the tracks that are still unmatched.
+        Unmatched confident detections start new tracks.
+
+        Args:
+            high_threshold (float): Detections at or above this score take part in the first pass
+            low_threshold (float): Detections below this score are ignored
+            new_track_threshold (float): Minimum score of a detection that starts a track
+            match_iou (float): Minimum IoU of a first-pass match
+            low_match_iou (float): Minimum IoU of a second-pass (low-confidence) match
+            max_lost (int): Frames a track survives without a matching detection
+        """
+        self.high_threshold = high_threshold
+        self.low_threshold = low_threshold
+        self.new_track_threshold = new_track_threshold
+        self.match_iou = match_iou
+        self.low_match_iou = low_match_iou
+        self.max_lost = max_lost
+        self.next_id = 1
+        self.ids = np.empty(0, dtype=np.int64)
+        self.mean = np.empty((0, 8))
+        self.covariance = np.empty((0, 8, 8))
+        self.scores = np.empty(0)
+        self.lost = np.empty(0, dtype=np.int64)  # Frames since the last matched detection
+
+    def __len__(self):
+        return len(self.ids)
+
+    def predict(self, steps=1):
+        """Advance every track by `steps` frames."""
+        if not len(self) or steps < 1:
+            return
+        F = np.linalg.matrix_power(_F, steps)
+        self.mean = self.mean @ F.T
+        h = self.mean[:, 3:4]
+        std = np.concatenate([np.repeat(_STD_POSITION * h, 4, axis=1), np.repeat(_STD_VELOCITY * h, 4, axis=1)], axis=1)
+        noise = np.einsum('ni,ij->nij', std ** 2 * steps, np.eye(8))
+        self.covariance = F @ self.covariance @ F.T + noise
+
+    def _correct(self, tracks, xywh, scores):
+        # Batched Kalman update of the given tracks with their matched measurements
+        mean, covariance = self.mean[tracks], self.covariance[tracks]
+        std = _STD_POSITION * mean[:, 3:4]
+        innovation_cov = covariance[:, :4, :4] + np.einsum('ni,ij->nij', np.repeat(std ** 2, 4, axis=1), np.eye(4))
+        # K = P H^T S^-1, computed as (S^-1 H P)^T since P and S are symmetric
+        gain = np.linalg.solve(innovation_cov, covariance[:, :4, :]).transpose(0, 2, 1)
+        self.mean[tracks] = mean + np.einsum('nij,nj->ni', gain, xywh - mean[:, :4])
+        self.covariance[tracks] = covariance - gain @ covariance[:, :4, :]
+        self.scores[tracks] = scores
+        self.lost[tracks] = 0
+
+    def _start(self, xywh, scores):
+        count = len(xywh)
+        if not count:
+            return np.empty(0, dtype=int)
+        mean = np.zeros((count, 8))
+        mean[:, :4] = xywh
+        h = xywh[:, 3:4]
+        std = np.concatenate([np.repeat(2 * _STD_POSITION * h, 4, axis=1), np.repeat(10 * _STD_VELOCITY * h, 4, axis=1)], axis=1)
+        first = len(self)
+        self.ids = np.concatenate([self.ids, np.arange(self.next_id, self.next_id + count)])
+        self.next_id += count
+        self.mean = np.concatenate([self.mean, mean])
+        self.covariance = np.concatenate([self.covariance, np.einsum('ni,ij->nij', std ** 2, np.eye(8))])
+        self.scores = np.concatenate([self.scores, scores])
+        self.lost = np.concatenate([self.lost, np.zeros(count, dtype=np.int64)])
+        return np.arange(first, first + count)
+
+    def update(self, boxes, scores, steps=1):
+        """Advance the tracks by `steps` frames and match them to a frame's detections.
+
+        Args:
+            boxes: (N, 4) detection boxes [x1, y1, x2, y2]
+            scores: (N,) detection confidences
+            steps (int): Frames since the previous update
+
+        Returns:
+            tuple: (boxes (M, 4) filtered [x1, y1, x2, y2], ids (M,), scores (M,))
+                of the tracks matched in this frame
+        """
+        boxes = as_boxes(boxes)
+        scores = np.asarray(scores, dtype=np.float64).reshape(-1)
+        self.predict(steps)
+        was_active = self.lost == 0
+        self.lost += steps
+
+        high = np.flatnonzero(scores >= self.high_threshold)
+        low = np.flatnonzero((scores >= self.low_threshold) & (scores < self.high_threshold))
+        predicted = _to_xyxy(self.mean[:, :4])
+
+        # First pass: confident detections against every track, lost ones included
+        rows, cols = linear_assignment(1 - pairwise_iou(predicted, boxes[high]), 1 - self.match_iou)
+        matched_tracks, matched_dets = [rows], [high[cols]]
+        # Second pass: low-confidence detections against tracks that were active and are still unmatched
+        unmatched_tracks = was_active.copy()
+        unmatched_tracks[rows] = False
+        remaining = np.flatnonzero(unmatched_tracks)
+        rows_low, cols_low = linear_assignment(1 - pairwise_iou(predicted[remaining], boxes[low]), 1 - self.low_match_iou)
+        matched_tracks.append(remaining[rows_low])
+        matched_dets.append(low[cols_low])
+        tracks, dets = np.concatenate(matched_tracks), np.concatenate(matched_dets)
+        if len(tracks):
+            self._correct(tracks, _to_xywh(boxes[dets]), scores[dets])
+
+        fresh = scores >= max(self.high_threshold, self.new_track_threshold)
+        fresh[dets] = False
+        new = np.flatnonzero(fresh)
+        started = self._start(_to_xywh(boxes[new]), scores[new])
+        current = np.concatenate([tracks, started]).astype(int)
+        output = (_to_xyxy(self.mean[current, :4]), self.ids[current], self.scores[current])
+
+        # Drop tracks that have gone unmatched for too long (indices shift, so after the output)
+        keep = self.lost <= self.max_lost
+        if not keep.all():
+            self.ids, self.mean, self.covariance = self.ids[keep], self.mean[keep], self.covariance[keep]
+            self.scores, self.lost = self.scores[keep], self.lost[keep]
+        return output
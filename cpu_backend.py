@@ -0,0 +1,162 @@
+import os
+import cv2
+import numpy as np
+
+BACKENDS = ('torch', 'onnx', 'openvino')
+
+def exported_model_path(model_path, backend, int8=False):
+    """Path of the exported model that export_model.py builds from a .pt file.
+
+    Args:
+        model_path (str): YOLOv8 .pt weights, e.g. 'yolov8n.pt'
+        backend (str): 'onnx' or 'openvino'
+        int8 (bool): Whether the INT8 quantized variant is wanted
+
+    Returns:
+        str: '<stem>.onnx', '<stem>-int8.onnx', '<stem>_openvino_model' or
+            '<stem>_int8_openvino_model'
+    """
+    stem = os.path.splitext(model_path)[0]
+    if backend == 'onnx':
+        return f'{stem}-int8.onnx' if int8 else f'{stem}.onnx'
+    if backend == 'openvino':
+        return f'{stem}_int8_openvino_model' if int8 else f'{stem}_openvino_model'
+    raise ValueError(f"No exported model for backend {backend!r}")
+
+def letterbox(image, size):
+    """Resize a BGR image to fit size x size, keeping its aspect ratio, and pad with gray.
+
+    Returns:
+        tuple: (padded image, scale, (pad x, pad y))
+    """
+    height, width = image.shape[:2]
+    scale = min(size / height, size / width)
+    new_w, new_h = int(round(width * scale)), int(round(height * scale))
+    pad_x, pad_y = (size - new_w) / 2, (size - new_h) / 2
+    resized = cv2.resize(image, (new_w, new_h), interpolation=cv2.INTER_LINEAR) if (new_w, new_h) != (width, height) else image
+    top, left = int(round(pad_y - 0.1)), int(round(pad_x - 0.1))
+    padded = cv2.copyMakeBorder(resized, top, size - new_h - top, left, size - new_w - left,
+                                cv2.BORDER_CONSTANT, value=(114, 114, 114))
+    return padded, scale, (left, top)
+
+def to_input_tensor(images, size):
+    """Letterbox a list of BGR images into one (N, 3, size, size) float32 RGB batch in [0, 1].
+
+    Returns:
+        tuple: (batch, list of (scale, (pad x, pad y)) per image)
+    """
+    batch = np.empty((len(images), 3, size, size), dtype=np.float32)
+    transforms = []
+    for i, image in enumerate(images):
+        padded, scale, pad = letterbox(image, size)
+        batch[i] = padded[..., ::-1].transpose(2, 0, 1)
+        transforms.append((scale, pad))
+    batch /= 255.0
+    return batch, transforms
+
+def decode_predictions(output, transforms, image_shapes, classes, conf_threshold=0.25, iou_threshold=0.7,
+                       max_det=300):
+    """Turn raw YOLOv8 head output into per-image detections, like ultralytics' NMS.
+
+    Args:
+        output (np.ndarray): (N, 4 + num_classes, anchors) raw predictions, boxes
+            as center x, center y, width, height in input pixels
+        transforms (list): (scale, (pad x, pad y)) per image from to_input_tensor
+        image_shapes (list): (height, width) of every original image
+        classes (tuple): Class ids to keep
+        conf_threshold (float): Minimum class confidence
+        iou_threshold (float): Per-class NMS IoU threshold
+        max_det (int): Most detections kept per image
+
+    Returns:
+        list: One (K, 6) float32 array [x1, y1, x2, y2, confidence, class] per image
+    """
+    detections = []
+    class_ids = np.asarray(classes)
+    for pred, (scale, (pad_x, pad_y)), (height, width) in zip(output, transforms, image_shapes):
+        # Best class over all of them, then the class filter, as ultralytics does:
+        # a box that is most likely something else is dropped, not relabelled
+        scores = pred[4:]
+        best = scores.argmax(axis=0)
+        conf = scores[best, np.arange(scores.shape[1])]
+        keep = (conf >= conf_threshold) & np.isin(best, class_ids)
+        if not keep.any():
+            detections.append(np.empty((0, 6), dtype=np.float32))
+            continue
+        cx, cy, w, h = pred[:4, keep]
+        conf, cls = conf[keep], best[keep]
+        boxes = np.stack([cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2], axis=1)
+        # NMSBoxesBatched expects (x, y, w, h) and suppresses within each class
+        picked = cv2.dnn.NMSBoxesBatched(np.stack([boxes[:, 0], boxes[:, 1], w, h], axis=1).tolist(),
+                                         conf.tolist(), cls.tolist(), conf_threshold, iou_threshold)
+        picked = np.asarray(picked, dtype=np.int64).reshape(-1)[:max_det]
+        boxes = boxes[picked]
+        boxes[:, [0, 2]] = np.clip((boxes[:, [0, 2]] - pad_x) / scale, 0, width)
+        boxes[:, [1, 3]] = np.clip((boxes[:, [1, 3]] - pad_y) / scale, 0, height)
+        detections.append(np.concatenate(
+            [boxes, conf[picked, None], cls[picked, None]], axis=1).astype(np.float32))
+    return detections
+
+class OnnxRuntimeModel:
+    def __init__(self, path, threads=None):
+        """YOLOv8 exported to ONNX, run with ONNX Runtime on the CPU.
+
+        Args:
+            path (str): .onnx file (FP32 or INT8 quantized)
+            threads (int): Intra-op threads; None lets ONNX Runtime use every core
+        """
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.inter_op_num_threads = 1
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(path, options, providers=['CPUExecutionProvider'])
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        # Static exports fix the batch and input size; dynamic ones leave strings there
+        self.fixed_batch = model_input.shape[0] if isinstance(model_input.shape[0], int) else None
+        self.fixed_size = model_input.shape[2] if isinstance(model_input.shape[2], int) else None
+
+    def run(self, batch):
+        if self.fixed_batch == 1 and len(batch) > 1:
+            return np.concatenate([self.session.run(None, {self.input_name: batch[i:i + 1]})[0]
+                                   for i in range(len(batch))])
+        return self.session.run(None, {self.input_name: batch})[0]
+
+class OpenVINOModel:
+    def __init__(self, path, threads=None):
+        """YOLOv8 exported to OpenVINO IR, compiled for the CPU.
+
+        Args:
+            path (str): Export directory containing the .xml/.bin pair (FP32 or INT8)
+            threads (int): Inference threads; None lets OpenVINO use every core
+        """
+        import openvino as ov
+
+        xml = path
+        if os.path.isdir(path):
+            xml = next(os.path.join(path, name) for name in sorted(os.listdir(path)) if name.endswith('.xml'))
+        config = {'PERFORMANCE_HINT': 'LATENCY'}
+        if threads:
+            config['INFERENCE_NUM_THREADS'] = threads
+        self.compiled = ov.Core().compile_model(xml, 'CPU', config)
+        shape = self.compiled.input(0).get_partial_shape()
+        self.fixed_batch = shape[0].get_length() if shape[0].is_static else None
+        self.fixed_size = shape[2].get_length() if shape[2].is_static else None
+
+    def run(self, batch):
+        if self.fixed_batch == 1 and len(batch) > 1:
+            return np.concatenate([self.compiled(batch[i:i + 1])[0] for i in range(len(batch))])
+        return self.compiled(batch)[0]
+
+def load_cpu_model(path, backend, threads=None):
+    """Load an exported model for the 'onnx' or 'openvino' backend."""
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Exported model {path} not found; build it with export_model.py")
+    if backend == 'onnx':
+        return OnnxRuntimeModel(path, threads)
+    if backend == 'openvino':
+        return OpenVINOModel(path, threads)
+    raise ValueError(f"Unknown backend {backend!r}; expected one of {BACKENDS}")
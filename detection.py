@@ -1,28 +1,166 @@
-from ultralytics import YOLO
-import torch
-import cv2
+import bisect
 import numpy as np
+import hashlib
+import os
+from motion import to_gray, frame_motion, propagate_detections
+from profiling import profiler, timed
+from cpu_backend import BACKENDS, exported_model_path, load_cpu_model, to_input_tensor, decode_predictions
+
+PERSON_CLASS = 0
+BALL_CLASS = 32
+DETECTION_CLASSES = (PERSON_CLASS, BALL_CLASS)
+# Frames after the previous ROI batch within which its last ball still centres the crop
+ROI_BALL_MEMORY = 5
+
+def detections_to_dicts(dets):
+    """Convert an (N, 6) detection array to the list-of-dicts format used by detect()."""
+    return [
+        {'bbox': row[:4].tolist(), 'confidence': float(row[4]), 'class': int(row[5])}
+        for row in dets
+    ]
+
+def split_detections(dets):
+    """Split an (N, 6) detection array into player boxes and the best ball box.
+    
+    Args:
+        dets (np.ndarray): Detections [x1, y1, x2, y2, confidence, class]
+        
+    Returns:
+        tuple: ((P, 4) player boxes, ball box [x1, y1, x2, y2] or None)
+    """
+    player_boxes = dets[dets[:, 5] == PERSON_CLASS, :4]
+    balls = dets[dets[:, 5] == BALL_CLASS]
+    ball_box = balls[np.argmax(balls[:, 4]), :4] if len(balls) else None
+    return player_boxes, ball_box
+
+def interpolate_ball(detections, detected):
+    """Replace the ball rows of frames that were not detected with boxes interpolated between detected frames.
+
+    Boxes copied or carried over from another frame are fine for players but
+    not for a small, fast ball: a held ball box followed by a jump reads as
+    extra contacts in localization. A frame between two detected frames that
+    both saw the ball gets a ball box on the straight line between them, with
+    the lower of their confidences; any other frame that was not detected
+    gets no ball row, which localization treats as a gap.
+
+    Args:
+        detections (list): One (N, 6) array per consecutive frame
+        detected (list): Indices of the frames whose detections came from the model
+
+    Returns:
+        list: Per-frame (N, 6) arrays; detected frames are passed through unchanged
+    """
+    detected = sorted(detected)
+    balls = {}
+    for i in detected:
+        rows = detections[i][detections[i][:, 5] == BALL_CLASS]
+        if len(rows):
+            balls[i] = rows[np.argmax(rows[:, 4])]
+    output = []
+    for i, dets in enumerate(detections):
+        k = bisect.bisect_left(detected, i)
+        if k < len(detected) and detected[k] == i:
+            output.append(dets)
+            continue
+        dets = dets[dets[:, 5] != BALL_CLASS]
+        previous = detected[k - 1] if k > 0 else None
+        following = detected[k] if k < len(detected) else None
+        if previous in balls and following in balls:
+            weight = (i - previous) / (following - previous)
+            ball = (1 - weight) * balls[previous] + weight * balls[following]
+            ball[4] = min(balls[previous][4], balls[following][4])
+            ball[5] = BALL_CLASS
+            dets = np.concatenate([dets, ball[None].astype(dets.dtype)])
+        output.append(dets)
+    return output
 
 class PlayerDetector:
-    def __init__(self, model_path='yolov8n.pt', device=None):
+    def __init__(self, model_path='yolov8n.pt', device=None, conf_threshold=0.25, iou_threshold=0.7, roi_sizes=None,
+                 backend='torch', int8=False, threads=None, imgsz=640, infer=None):
         """Initialize the YOLOv8 model for player and ball detection.
         
         Args:
             model_path (str): Path to YOLOv8 weights
-            device (str): Device to run inference on ('cuda' or 'cpu')
+            device (str): Device to run inference on ('cuda' or 'cpu'); torch backend only
+            conf_threshold (float): Minimum detection confidence
+            iou_threshold (float): IoU threshold used by non-maximum suppression
+            roi_sizes (tuple): (global input size, crop size) to enable ball-first
+                ROI detection (see detect_roi_batch); None runs whole frames
+            backend (str): 'torch' (ultralytics), or 'onnx' / 'openvino' to run the
+                model exported by export_model.py on the CPU
+            int8 (bool): Use the INT8 quantized export (onnx / openvino only)
+            threads (int): Intra-op CPU threads; None keeps the runtime's default
+            imgsz (int): Input size of an exported model whose size is not fixed
+            infer (callable): Run infer(images, imgsz) -> one (N, 6) array per image
+                instead of loading a model, e.g. ground truth in benchmarks;
+                backend and weights are then ignored
         """
-        if device is None:
-            device = 'cuda' if torch.cuda.is_available() else 'cpu'
-        
-        self.model = YOLO(model_path)
-        self.model.to(device)
+        if infer is None and backend not in BACKENDS:
+            raise ValueError(f"Unknown backend {backend!r}; expected one of {BACKENDS}")
+        self.backend = 'custom' if infer is not None else backend
+        self.imgsz = imgsz
+        self._custom_infer = infer
+        if infer is not None:
+            device = 'cpu'
+            self.model = None
+        elif backend == 'torch':
+            # Deferred so importing this module stays cheap
+            import torch
+            from ultralytics import YOLO
+            
+            if device is None:
+                device = 'cuda' if torch.cuda.is_available() else 'cpu'
+            if threads:
+                torch.set_num_threads(threads)
+            self.model = YOLO(model_path)
+            self.model.to(device)
+        else:
+            device = 'cpu'
+            model_path = exported_model_path(model_path, backend, int8)
+            self.model = load_cpu_model(model_path, backend, threads)
+            # Exports with a static input size only accept that size
+            self.imgsz = self.model.fixed_size or imgsz
         self.device = device
+        self.model_path = model_path
+        self.conf_threshold = conf_threshold
+        self.iou_threshold = iou_threshold
+        self.roi_sizes = tuple(roi_sizes) if roi_sizes else None
+        # Optional DetectionCache for the video currently being processed
+        self.cache = None
+        # Frames that actually went through the model (cache hits excluded)
+        self.inferred_frames = 0
+        # (frame index, ball centre) of the last ROI-detected frame, see detect_roi_batch
+        self._roi_ball = None
+        
+    def cache_key(self):
+        """Identify the weights and thresholds that detections depend on.
         
-    def detect(self, frame):
+        Returns:
+            dict: Key used by DetectionCache to separate incompatible results
+        """
+        weights = os.path.basename(self.model_path)
+        if os.path.isfile(self.model_path):
+            with open(self.model_path, 'rb') as f:
+                weights = hashlib.sha1(f.read()).hexdigest()
+        key = {
+            'weights': weights,
+            'conf': self.conf_threshold,
+            'iou': self.iou_threshold,
+            'classes': list(DETECTION_CLASSES)
+        }
+        if self.backend != 'torch':
+            # Exported models decode and suppress boxes slightly differently
+            key['backend'] = self.backend
+        if self.roi_sizes:
+            key['roi'] = list(self.roi_sizes)
+        return key
+        
+    def detect(self, frame, frame_idx=None):
         """Detect players and ball in a frame.
         
         Args:
             frame (np.ndarray): Input frame in BGR format
+            frame_idx (int): Frame index in the current video; enables the detection cache
             
         Returns:
             list: List of detections, each containing:
@@ -30,43 +168,232 @@ class PlayerDetector:
                 - confidence: float
                 - class: int (0 for person, 32 for sports ball)
         """
-        results = self.model(frame, verbose=False)
-        detections = []
+        dets = self.detect_batch([frame], frame_indices=None if frame_idx is None else [frame_idx])[0]
+        return detections_to_dicts(dets)
+    
+    def detect_batch(self, frames, batch_size=16, frame_indices=None):
+        """Detect players and ball in several frames with batched forward passes.
+        
+        Args:
+            frames (list): Input frames in BGR format
+            batch_size (int): Number of frames stacked into one forward pass
+            frame_indices (list): Frame index of each frame in the current video;
+                enables the detection cache so only uncached frames are inferred
+            
+        Returns:
+            list: One (N, 6) float32 array per frame with rows
+                [x1, y1, x2, y2, confidence, class], filtered to classes 0 and 32
+        """
+        use_cache = self.cache is not None and frame_indices is not None
+        detections = [None] * len(frames)
+        pending = []
+        for i in range(len(frames)):
+            cached = self.cache.get(frame_indices[i]) if use_cache else None
+            if cached is not None:
+                detections[i] = cached
+            else:
+                pending.append(i)
+        
+        if frame_indices is None:
+            # Positions within this call stand in for frame indices, so no ball is carried into or out of it
+            self._roi_ball = None
+        with profiler.span('detect', detect_frames=len(pending)):
+            for start in range(0, len(pending), batch_size):
+                chunk = pending[start:start + batch_size]
+                chunk_frames = [frames[i] for i in chunk]
+                if self.roi_sizes:
+                    chunk_dets = self.detect_roi_batch(
+                        chunk_frames, *self.roi_sizes,
+                        frame_indices=[frame_indices[i] if frame_indices is not None else i for i in chunk])
+                else:
+                    chunk_dets = self._infer(chunk_frames)
+                self.inferred_frames += len(chunk)
+                for i, dets in zip(chunk, chunk_dets):
+                    detections[i] = dets
+                    if use_cache:
+                        self.cache.put(frame_indices[i], dets)
+        if frame_indices is None:
+            self._roi_ball = None
         
+        return detections
+    
+    def _infer(self, images, imgsz=None):
+        # One forward pass over a list of images; (N, 6) arrays in image coordinates
+        if self._custom_infer is not None:
+            return self._custom_infer(images, imgsz)
+        if self.backend != 'torch':
+            # A static export runs at its own size whatever the caller asked for
+            size = imgsz if imgsz and not self.model.fixed_size else self.imgsz
+            batch, transforms = to_input_tensor(images, size)
+            return decode_predictions(self.model.run(batch), transforms, [image.shape[:2] for image in images],
+                                      DETECTION_CLASSES, self.conf_threshold, self.iou_threshold)
+        options = {} if imgsz is None else {'imgsz': imgsz}
+        results = self.model(images, verbose=False, conf=self.conf_threshold, iou=self.iou_threshold, **options)
+        detections = []
         for result in results:
-            for box in result.boxes.data:
-                x1, y1, x2, y2, conf, cls = box.tolist()
-                # Only keep person (0) and sports ball (32) detections
-                if int(cls) in [0, 32]:
-                    detections.append({
-                        'bbox': [x1, y1, x2, y2],
-                        'confidence': conf,
-                        'class': int(cls)
-                    })
+            data = result.boxes.data.cpu().numpy().astype(np.float32)
+            # Only keep person (0) and sports ball (32) detections
+            detections.append(data[np.isin(data[:, 5], DETECTION_CLASSES)])
+        return detections
+    
+    def detect_roi_batch(self, frames, global_size=320, crop_size=320, frame_indices=None):
+        """Ball-first detection: a low-resolution pass over the whole frame, then
+        a full-resolution pass over a crop around the ball.
+        
+        The global pass finds the ball and the rough player layout. A
+        crop_size x crop_size window of original pixels centred on the ball
+        (or on the last ball seen if this frame has none) is then detected at
+        its native resolution, where the small ball and the players fighting
+        for it are much easier to resolve. Inside the crop the second pass
+        replaces the global detections; outside it the global detections are
+        kept. Frames without any known ball keep the global pass only. Both
+        passes use the same model; with the default sizes they cost half of
+        one 640px pass.
+        
+        The last ball seen is carried over to the next call when its first
+        frame follows the previous call's last frame within
+        ROI_BALL_MEMORY frames, so a batch boundary does not lose the crop.
+        
+        Args:
+            frames (list): Consecutive input frames in BGR format
+            global_size (int): Model input size of the whole-frame pass
+            crop_size (int): Side of the crop around the ball, in frame pixels
+                and model input size of the crop pass
+            frame_indices (list): Frame index of each frame; None treats the
+                frames as unrelated to earlier calls
+            
+        Returns:
+            list: One (N, 6) float32 array per frame, as detect_batch
+        """
+        global_dets = self._infer(frames, imgsz=global_size)
+        crops, regions = [], []
+        ball_center = None
+        if frame_indices is not None and self._roi_ball is not None:
+            last_idx, center = self._roi_ball
+            if 0 < frame_indices[0] - last_idx <= ROI_BALL_MEMORY:
+                ball_center = center
+        for frame, dets in zip(frames, global_dets):
+            _, ball_box = split_detections(dets)
+            if ball_box is not None:
+                ball_center = ((ball_box[0] + ball_box[2]) / 2, (ball_box[1] + ball_box[3]) / 2)
+            if ball_center is None:
+                regions.append(None)
+                continue
+            height, width = frame.shape[:2]
+            x1 = int(min(max(ball_center[0] - crop_size / 2, 0), max(width - crop_size, 0)))
+            y1 = int(min(max(ball_center[1] - crop_size / 2, 0), max(height - crop_size, 0)))
+            x2, y2 = min(x1 + crop_size, width), min(y1 + crop_size, height)
+            crops.append(frame[y1:y2, x1:x2])
+            regions.append((x1, y1, x2, y2))
+        if frame_indices is not None:
+            self._roi_ball = (frame_indices[-1], ball_center)
+        crop_dets = iter(self._infer(crops, imgsz=crop_size) if crops else [])
         
+        detections = []
+        for dets, region in zip(global_dets, regions):
+            if region is None:
+                detections.append(dets)
+                continue
+            x1, y1, x2, y2 = region
+            local = next(crop_dets).copy()
+            local[:, [0, 2]] += x1
+            local[:, [1, 3]] += y1
+            # Global detections whose center falls outside the crop survive
+            cx = (dets[:, 0] + dets[:, 2]) / 2
+            cy = (dets[:, 1] + dets[:, 3]) / 2
+            outside = (cx < x1) | (cx >= x2) | (cy < y1) | (cy >= y2)
+            detections.append(np.concatenate([local, dets[outside]]))
         return detections
     
-    def get_player_boxes(self, frame):
+    @timed('detect')
+    def detect_sparse(self, frames, frame_indices=None, keyframe_interval=5, motion_threshold=0.08,
+                      min_quality=0.6, batch_size=16, motion_width=160):
+        """Detect on keyframes only and carry boxes to the frames in between with optical flow.
+        
+        A frame is a keyframe if it is the first of the sequence, keyframe_interval
+        frames past the previous keyframe, already in the detection cache, or
+        differs from the previous keyframe by more than motion_threshold (a cut or
+        a fast pan); the last frame is always one. Keyframes are detected in
+        batches up front; every other frame gets the previous frame's player
+        detections moved by sparse optical flow, and is detected after all if
+        fewer than min_quality of the propagated boxes' points could be
+        followed. The ball is not propagated but interpolated between detected
+        frames (see interpolate_ball). Propagated confidences are scaled down by
+        the share of points followed, and propagated frames are never cached.
+        
+        Args:
+            frames (list): Consecutive input frames in BGR format
+            frame_indices (list): Frame index of each frame; enables the detection cache
+            keyframe_interval (int): Largest number of frames between two detections
+            motion_threshold (float): Mean absolute difference to the last keyframe
+                (0-1, on a motion_width-wide grayscale copy) that forces a detection
+            min_quality (float): Smallest share of followed flow points before re-detecting
+            batch_size (int): Number of frames stacked into one forward pass
+            motion_width (int): Width the frames are downscaled to for the motion check
+            
+        Returns:
+            list: One (N, 6) float32 array per frame, as detect_batch
+        """
+        if keyframe_interval <= 1 or len(frames) <= 1:
+            return self.detect_batch(frames, batch_size, frame_indices)
+        use_cache = self.cache is not None and frame_indices is not None
+        small = [to_gray(frame, motion_width) for frame in frames]
+        keyframes = []
+        for i in range(len(frames)):
+            # The last frame is a keyframe too, so the ball can be interpolated up to the end
+            if (not keyframes or i - keyframes[-1] >= keyframe_interval or i == len(frames) - 1
+                    or (use_cache and frame_indices[i] in self.cache)
+                    or frame_motion(small[keyframes[-1]], small[i]) > motion_threshold):
+                keyframes.append(i)
+        
+        detections = [None] * len(frames)
+        key_dets = self.detect_batch([frames[i] for i in keyframes], batch_size,
+                                     [frame_indices[i] for i in keyframes] if frame_indices is not None else None)
+        for i, dets in zip(keyframes, key_dets):
+            detections[i] = dets
+        
+        # Only players are carried by flow; the small, fast ball rarely survives the
+        # forward-backward check and is interpolated between detected frames instead
+        detected = list(keyframes)
+        gray = [None] * len(frames)
+        for i in range(1, len(frames)):
+            if detections[i] is not None:
+                continue
+            if gray[i - 1] is None:
+                gray[i - 1] = to_gray(frames[i - 1])
+            gray[i] = to_gray(frames[i])
+            players = detections[i - 1][detections[i - 1][:, 5] != BALL_CLASS]
+            moved, quality = propagate_detections(gray[i - 1], gray[i], players)
+            if quality < min_quality:
+                # Flow lost the players: detect this frame after all
+                moved = self.detect_batch([frames[i]], 1, None if frame_indices is None else [frame_indices[i]])[0]
+                detected.append(i)
+            detections[i] = moved
+        return interpolate_ball(detections, detected)
+    
+    def get_player_boxes(self, frame, frame_idx=None):
         """Get only player bounding boxes from the frame.
         
         Args:
             frame (np.ndarray): Input frame in BGR format
+            frame_idx (int): Frame index in the current video; enables the detection cache
             
         Returns:
             list: List of player bounding boxes [x1, y1, x2, y2]
         """
-        detections = self.detect(frame)
+        detections = self.detect(frame, frame_idx)
         return [det['bbox'] for det in detections if det['class'] == 0]
     
-    def get_ball_box(self, frame):
+    def get_ball_box(self, frame, frame_idx=None):
         """Get the ball bounding box from the frame.
         
         Args:
             frame (np.ndarray): Input frame in BGR format
+            frame_idx (int): Frame index in the current video; enables the detection cache
             
         Returns:
             list: Ball bounding box [x1, y1, x2, y2] or None if not found
         """
-        detections = self.detect(frame)
+        detections = self.detect(frame, frame_idx)
         ball_dets = [det for det in detections if det['class'] == 32]
         return ball_dets[0]['bbox'] if ball_dets else None 
\ No newline at end of file
@@ -0,0 +1,134 @@
+import os
+import json
+import hashlib
+from collections import OrderedDict
+import numpy as np
+from video_utils import video_fingerprint
+
+# Each detection is stored as one float32 row: x1, y1, x2, y2, confidence, class
+DET_COLUMNS = 6
+# Each index record is one int64 row: frame index, row offset, row count
+INDEX_COLUMNS = 3
+
+class DetectionCache:
+    def __init__(self, video_path, model_key, cache_dir='.detection_cache', max_frames=4096, shard=''):
+        """Per-frame detection cache with an in-memory LRU and an on-disk store.
+
+        Entries are keyed by (video fingerprint, frame index, model weights,
+        thresholds). The disk store is a pair of append-only binary files per
+        (video, model) key: `detections.bin` holds every detection row and
+        `index.bin` maps frame indices to row ranges. Detections are read back
+        through a memory map, so re-runs only pay inference on unseen frames.
+        
+        Processes sharing a store each append to their own shard
+        (`detections-<shard>.bin` / `index-<shard>.bin`) and read all shards.
+
+        Args:
+            video_path (str): Path to the video the frame indices refer to
+            model_key (dict): Model weights and thresholds, see PlayerDetector.cache_key
+            cache_dir (str): Root directory of the on-disk store
+            max_frames (int): Number of frames kept in the in-memory LRU
+            shard (str): Name of the shard this process appends to
+        """
+        key = json.dumps({'video': video_fingerprint(video_path), 'model': model_key}, sort_keys=True)
+        self.path = os.path.join(cache_dir, hashlib.sha1(key.encode()).hexdigest()[:16])
+        os.makedirs(self.path, exist_ok=True)
+        with open(os.path.join(self.path, 'key.json'), 'w') as f:
+            f.write(key)
+        self.shard = shard
+        self.max_frames = max_frames
+        self._memory = OrderedDict()
+        # frame index -> (shard, row offset, row count), merged over all shards
+        self._index = {}
+        for name in sorted(os.listdir(self.path)):
+            if name.startswith('index') and name.endswith('.bin') and name != self._shard_file('index'):
+                self._load_index(name[len('index'):-len('.bin')].lstrip('-'), truncate=False)
+        self._rows = self._load_index(shard, truncate=True)
+        # Discard rows an interrupted run wrote without an index record
+        data_path = os.path.join(self.path, self._shard_file('detections'))
+        if os.path.exists(data_path):
+            os.truncate(data_path, self._rows * DET_COLUMNS * 4)
+        self._data = {}
+        self._data_file = open(data_path, 'ab')
+        self._index_file = open(os.path.join(self.path, self._shard_file('index')), 'ab')
+
+    def _shard_file(self, kind, shard=None):
+        shard = self.shard if shard is None else shard
+        return f'{kind}-{shard}.bin' if shard else f'{kind}.bin'
+
+    def _load_index(self, shard, truncate):
+        # Returns the number of data rows the shard's index refers to
+        index_path = os.path.join(self.path, self._shard_file('index', shard))
+        if not os.path.exists(index_path):
+            return 0
+        records = np.fromfile(index_path, dtype=np.int64)
+        # Drop a partially written trailing record left by an interrupted run
+        records = records[:len(records) - len(records) % INDEX_COLUMNS].reshape(-1, INDEX_COLUMNS)
+        if truncate:
+            os.truncate(index_path, records.nbytes)
+        rows = 0
+        for frame_idx, offset, count in records.tolist():
+            self._index.setdefault(frame_idx, (shard, offset, count))
+            rows = max(rows, offset + count)
+        return rows
+
+    def _remember(self, frame_idx, detections):
+        self._memory[frame_idx] = detections
+        self._memory.move_to_end(frame_idx)
+        while len(self._memory) > self.max_frames:
+            self._memory.popitem(last=False)
+
+    def get(self, frame_idx):
+        """Get cached detections for a frame.
+
+        Returns:
+            np.ndarray: (N, 6) float32 detections or None on a cache miss
+        """
+        detections = self._memory.get(frame_idx)
+        if detections is not None:
+            self._memory.move_to_end(frame_idx)
+            return detections
+        entry = self._index.get(frame_idx)
+        if entry is None:
+            return None
+        shard, offset, count = entry
+        if count == 0:
+            detections = np.empty((0, DET_COLUMNS), dtype=np.float32)
+        else:
+            data = self._data.get(shard)
+            if data is None or data.shape[0] < offset + count:
+                # The shard grew since it was last mapped
+                data_path = os.path.join(self.path, self._shard_file('detections', shard))
+                data = np.memmap(data_path, dtype=np.float32, mode='r').reshape(-1, DET_COLUMNS)
+                self._data[shard] = data
+            detections = np.array(data[offset:offset + count])
+        self._remember(frame_idx, detections)
+        return detections
+
+    def put(self, frame_idx, detections):
+        """Store detections for a frame in memory and on disk.
+
+        Args:
+            frame_idx (int): Frame index
+            detections (np.ndarray): (N, 6) detections [x1, y1, x2, y2, conf, class]
+        """
+        detections = np.asarray(detections, dtype=np.float32).reshape(-1, DET_COLUMNS)
+        self._remember(frame_idx, detections)
+        if frame_idx in self._index:
+            return
+        # Data is written before its index record so a crash never leaves a dangling entry
+        self._data_file.write(detections.tobytes())
+        self._data_file.flush()
+        self._index_file.write(np.array([frame_idx, self._rows, len(detections)], dtype=np.int64).tobytes())
+        self._index_file.flush()
+        self._index[frame_idx] = (self.shard, self._rows, len(detections))
+        self._rows += len(detections)
+
+    def __contains__(self, frame_idx):
+        return frame_idx in self._memory or frame_idx in self._index
+
+    def close(self):
+        self._data_file.close()
+        self._index_file.close()
+        self._data = {}
+        self._memory.clear()
@@ -1,8 +1,17 @@
 import pandas as pd
-from video_utils import get_frame_at_timestamp, parse_timestamp
-from predictor import predict_player_for_event
+from video_utils import parse_timestamp, window_bounds, VideoFrameReader
+from predictor import (predict_player_for_event, predict_player_from_store, attribute_stream, get_player_detector,
+                       warm_up_models, configure, reset_match_state, _no_player)
+from detection_cache import DetectionCache
+from track_store import TrackStore
+from pipeline import run_pipeline
+from shared_frames import DetectorPool
+from profiling import profiler, merge_traces, STAGE_COLUMNS
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing as mp
+import csv
+import os
 import time
-import cv2
 
 def format_timestamp_hms(seconds):
     hours = int(seconds // 3600)
@@ -10,26 +19,313 @@ def format_timestamp_hms(seconds):
     secs = seconds % 60
     return f"{hours:02}:{minutes:02}:{secs:04.1f}" if secs % 1 else f"{hours:02}:{minutes:02}:{int(secs):02}"
 
-def process_events(event_csv, video_path, output_csv):
+def _write_results(events, results, output_csv, extra_columns=()):
+    # Write rows back in the original eval.csv order
+    ordered = [results[idx] for idx in events.index]
+    columns = ['timestamp', 'event', 'player', 'receiver', 'latency'] + list(extra_columns)
+    pd.DataFrame(ordered, columns=columns).to_csv(output_csv, index=False)
+    print(f"Predictions written to {output_csv}")
+
+def _result_row(timestamp, event, player, receiver, latency):
+    out_timestamp = format_timestamp_hms(timestamp)
+    if event.lower() == 'pass':
+        return [out_timestamp, event, player, receiver, latency]
+    return [out_timestamp, event, player, 'NONE', latency]
+
+class ResultCheckpoint:
+    def __init__(self, output_csv):
+        """Append-only record of finished events next to an output CSV, for resuming a run.
+        
+        Rows go to '<output_csv>.partial' with the event's original row index
+        in front, flushed one event at a time. A row cut short by a crash is
+        dropped when the checkpoint is loaded again.
+        
+        Args:
+            output_csv (str): Final output path the checkpoint belongs to
+        """
+        self.path = output_csv + '.partial'
+        self._file = None
+        
+    def load(self, columns):
+        """Get the rows already finished, as {row index: row}, each padded or cut to `columns` values."""
+        if not os.path.exists(self.path):
+            return {}
+        with open(self.path, 'rb+') as f:
+            data = f.read()
+            # Drop a trailing partial line left by a crash mid-write
+            end = data.rfind(b'\n') + 1
+            if end < len(data):
+                f.truncate(end)
+        done = {}
+        with open(self.path, newline='') as f:
+            for record in csv.reader(f):
+                if len(record) < 2:
+                    continue
+                row = record[1:columns + 1]
+                done[int(record[0])] = row + [''] * (columns - len(row))
+        return done
+        
+    def append(self, idx, row):
+        if self._file is None:
+            self._file = open(self.path, 'a', newline='')
+        csv.writer(self._file).writerow([idx] + list(row))
+        self._file.flush()
+        
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            
+    def remove(self):
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+def process_events_from_store(event_csv, store_path, output_csv, window=1.0):
+    # Answer every event from a precomputed TrackStore (see precompute.py); no video decode or inference
     events = pd.read_csv(event_csv)
-    results = []
-    # Get FPS from video
-    cap = cv2.VideoCapture(video_path)
-    fps = cap.get(cv2.CAP_PROP_FPS)
-    cap.release()
+    store = TrackStore.load(store_path)
+    results = {}
     for idx, row in events.iterrows():
-        timestamp_raw = row['timestamp']
-        timestamp = parse_timestamp(timestamp_raw)
+        timestamp = parse_timestamp(row['timestamp'])
         event = row['event']
-        frame = get_frame_at_timestamp(video_path, timestamp)
         start_time = time.time()
-        # Pass video_path, timestamp, and fps for tracking-based attribution
-        player, receiver = predict_player_for_event(frame, event, video_path=video_path, timestamp=timestamp, fps=fps)
+        player, receiver = predict_player_from_store(event, timestamp, store, window=window)
         latency = round(time.time() - start_time, 3)
-        out_timestamp = format_timestamp_hms(timestamp)
-        if event.lower() == 'pass':
-            results.append([out_timestamp, event, player, receiver, latency])
-        else:
-            results.append([out_timestamp, event, player, 'NONE', latency])
-    pd.DataFrame(results, columns=['timestamp', 'event', 'player', 'receiver', 'latency']).to_csv(output_csv, index=False)
-    print(f"Predictions written to {output_csv}") 
\ No newline at end of file
+        results[idx] = _result_row(timestamp, event, player, receiver, latency)
+    _write_results(events, results, output_csv)
+
+def _attribute_rows(rows, video_path, window=1.0, cache_frames=128, detection_cache_dir='.detection_cache',
+                    cache_shard='', loader=None, pipeline=False, queue_size=2, predictor_options=None,
+                    stage_timings=False, trace_path=None, stream_windows=False, on_result=None, detect_workers=1):
+    # rows: (index, timestamp in seconds, event) tuples in timestamp order.
+    # Returns {index: output row}; rows have no player if the video could not be opened.
+    # stage_timings appends the per-stage breakdown (STAGE_COLUMNS) to every row;
+    # trace_path writes this process's spans as a Chrome trace. stream_windows
+    # streams each window through detection instead of decoding it into a list
+    # (not combined with pipeline). on_result(index, row) is called as each event finishes.
+    # detect_workers > 1 streams windows through that many detector processes fed
+    # from a shared-memory frame ring (see shared_frames.DetectorPool).
+    configure(**(predictor_options or {}))
+    # Tracks and jersey votes from a previous video must not leak into this one
+    reset_match_state()
+    if stage_timings or trace_path:
+        profiler.enabled = True
+        if loader is None:
+            # With a loader, process_events reset before starting it so its spans are kept
+            profiler.reset()
+    # One capture for the whole run; events are visited in timestamp order so the
+    # reader only walks forward and overlapping windows come out of its frame cache
+    # Streaming keeps frames only in the reader's fixed ring, never in the cache
+    reader = VideoFrameReader(video_path, cache_size=0 if stream_windows else cache_frames)
+    results = {}
+    
+    def finish(idx, timestamp, event, player, receiver, latency):
+        row = _result_row(timestamp, event, player, receiver, latency)
+        if stage_timings:
+            breakdown = profiler.breakdown(idx)
+            row.extend(breakdown[column] for column in STAGE_COLUMNS)
+        results[idx] = row
+        if on_result is not None:
+            on_result(idx, row)
+    
+    if not reader.is_opened():
+        print(f"Error: Could not open video {video_path}")
+        # Every event still gets a row, with no player attributed
+        for idx, timestamp, event in rows:
+            finish(idx, timestamp, event, *_no_player(event), 0.0)
+        return results
+    fps = reader.fps
+    # With a detector pool, the workers detect (and cache) and this process needs no detector
+    pooled = detect_workers > 1 and bool(rows) and not pipeline
+    # Time spent waiting for models is charged to the first event as model_load_s,
+    # but kept out of its latency
+    with profiler.event(rows[0][0] if rows else None):
+        with profiler.span('model_load'):
+            if loader is not None:
+                loader.join()
+            elif rows:
+                # No background loader (worker segments, warm_up=False): load here, not inside the first event
+                warm_up_models(background=False, detector=not pooled)
+        # Detections persist across runs, so only frames never seen before go through YOLO
+        player_detector = None
+        if detection_cache_dir and rows and not pooled:
+            player_detector = get_player_detector()
+            player_detector.cache = DetectionCache(video_path, player_detector.cache_key(),
+                                                   cache_dir=detection_cache_dir, shard=cache_shard)
+    detector_pool = None
+    if pooled:
+        detector_pool = DetectorPool(detect_workers, reader.frame_shape(), predictor_options=predictor_options,
+                                     video_path=video_path, detection_cache_dir=detection_cache_dir,
+                                     cache_shard=cache_shard)
+    if pipeline:
+        # Decode, detection and attribution overlap in separate threads
+        events = {idx: (timestamp, event) for idx, timestamp, event in rows}
+        for idx, player, receiver, latency in run_pipeline(rows, reader, window, queue_size, queue_size):
+            timestamp, event = events[idx]
+            finish(idx, timestamp, event, player, receiver, latency)
+    elif stream_windows or detector_pool is not None:
+        try:
+            for idx, timestamp, event in rows:
+                with profiler.event(idx):
+                    start_time = time.time()
+                    start, end = window_bounds(timestamp, fps, window)
+                    player, receiver = attribute_stream(event, reader, start, end, int(timestamp * fps),
+                                                        detector_pool=detector_pool)
+                    latency = round(time.time() - start_time, 3)
+                finish(idx, timestamp, event, player, receiver, latency)
+        finally:
+            if detector_pool is not None:
+                detector_pool.close()
+    else:
+        for idx, timestamp, event in rows:
+            with profiler.event(idx):
+                start_time = time.time()
+                start, end = window_bounds(timestamp, fps, window)
+                with profiler.span('decode') as counts:
+                    frames = reader.read_window(start, end)
+                    frame = reader.read(int(timestamp * fps))
+                    counts['decode_frames'] = len(frames)
+                player, receiver = predict_player_for_event(frame, event, timestamp=timestamp, fps=fps, frames=frames, start_frame=start)
+                latency = round(time.time() - start_time, 3)
+            finish(idx, timestamp, event, player, receiver, latency)
+    if trace_path:
+        profiler.write_trace(trace_path)
+    reader.release()
+    if player_detector is not None and player_detector.cache is not None:
+        player_detector.cache.close()
+        player_detector.cache = None
+    return results
+
+def _init_worker(threads):
+    # Runs before torch is imported in the worker, so the per-process thread
+    # budget applies to its intra-op pool
+    os.environ['OMP_NUM_THREADS'] = str(threads)
+    os.environ['MKL_NUM_THREADS'] = str(threads)
+
+def _attribute_segment(args):
+    rows, video_path, options = args
+    return _attribute_rows(rows, video_path, **options)
+
+def process_events(event_csv, video_path, output_csv, window=1.0, cache_frames=128, detection_cache_dir='.detection_cache',
+                   warm_up=True, workers=1, pipeline=False, queue_size=2, predictor_options=None,
+                   stage_timings=False, trace_path=None, stream_windows=False, resume=False, detect_workers=1):
+    # predictor_options are passed to predictor.configure() in every process.
+    # resume appends every finished event to '<output_csv>.partial' and skips the
+    # events already there, so a crashed run picks up where it stopped. detect_workers
+    # runs detection in that many processes per video, see _attribute_rows.
+    configure(**(predictor_options or {}))
+    if (stage_timings or trace_path) and workers <= 1:
+        # Before the loader starts, so its model_load spans are not wiped
+        profiler.enabled = True
+        profiler.reset()
+    # Models load in the background while the CSV is parsed and the video opened
+    loader = None
+    if warm_up and workers <= 1:
+        loader = warm_up_models(background=True, detector=detect_workers <= 1 or pipeline)
+    events = pd.read_csv(event_csv)
+    rows = sorted(
+        ((idx, parse_timestamp(row['timestamp']), row['event']) for idx, row in events.iterrows()),
+        key=lambda item: item[1]
+    )
+    extra_columns = STAGE_COLUMNS if stage_timings else ()
+    checkpoint = ResultCheckpoint(output_csv) if resume else None
+    done = checkpoint.load(5 + len(extra_columns)) if checkpoint else {}
+    if done:
+        print(f"Resuming {output_csv}: {len(done)} of {len(rows)} events already done")
+        rows = [row for row in rows if row[0] not in done]
+    on_result = checkpoint.append if checkpoint else None
+    if workers > 1 and len(rows) > 1:
+        # Contiguous time segments: each worker loads its own models once and
+        # only decodes its own stretch of the video
+        workers = min(workers, len(rows))
+        segment_size = -(-len(rows) // workers)
+        segments = [rows[i:i + segment_size] for i in range(0, len(rows), segment_size)]
+        threads = max(1, (os.cpu_count() or 1) // len(segments))
+        options = dict(window=window, cache_frames=cache_frames, detection_cache_dir=detection_cache_dir,
+                       pipeline=pipeline, queue_size=queue_size, predictor_options=predictor_options,
+                       stage_timings=stage_timings, stream_windows=stream_windows, detect_workers=detect_workers)
+        # Each worker writes its own trace; they are merged into trace_path at the end
+        shard_traces = [f'{trace_path}.w{i}' if trace_path else None for i in range(len(segments))]
+        jobs = [(segment, video_path, dict(options, cache_shard=f'w{i}', trace_path=shard_traces[i]))
+                for i, segment in enumerate(segments)]
+        results = {}
+        with ProcessPoolExecutor(max_workers=len(segments), mp_context=mp.get_context('spawn'),
+                                 initializer=_init_worker, initargs=(threads,)) as pool:
+            for segment_results in pool.map(_attribute_segment, jobs):
+                results.update(segment_results)
+                if on_result is not None:
+                    # Checkpointed per finished segment; callbacks do not cross processes
+                    for idx, row in segment_results.items():
+                        on_result(idx, row)
+        if trace_path:
+            merge_traces(shard_traces, trace_path)
+    else:
+        results = _attribute_rows(rows, video_path, window, cache_frames, detection_cache_dir, loader=loader,
+                                  pipeline=pipeline, queue_size=queue_size, predictor_options=predictor_options,
+                                  stage_timings=stage_timings, trace_path=trace_path, stream_windows=stream_windows,
+                                  on_result=on_result, detect_workers=detect_workers)
+    results.update(done)
+    _write_results(events, results, output_csv, extra_columns)
+    if checkpoint:
+        checkpoint.remove()
+    if trace_path:
+        print(f"Stage trace written to {trace_path}")
+
+def add_processing_arguments(parser):
+    """Add the attribution options shared by main.py and batch_runner.py to an argparse parser."""
+    parser.add_argument("--window", type=float, default=1.0, help="Seconds of video on each side of an event")
+    parser.add_argument("--pipeline", action="store_true", help="Overlap decode, detection and attribution in separate threads")
+    parser.add_argument("--queue-size", type=int, default=2, help="Event windows buffered between pipeline stages")
+    parser.add_argument("--stream-windows", action="store_true",
+                        help="Stream each window through detection with a fixed frame ring instead of decoding it whole")
+    parser.add_argument("--detect-workers", type=int, default=1,
+                        help="Detector processes fed from a shared-memory frame ring (implies --stream-windows)")
+    parser.add_argument("--stage-timings", action="store_true",
+                        help="Add per-stage time and count columns (decode, detect, track, OCR, ...) to the output")
+    parser.add_argument("--pose", action="store_true", help="Read jersey numbers from pose-estimated torso crops")
+    parser.add_argument("--last-frame", action="store_true",
+                        help="Attribute on the last frame of the window instead of the localized ball contact")
+    parser.add_argument("--detect-every", type=int, default=1,
+                        help="Run detection on every Kth frame and carry boxes forward with optical flow in between")
+    parser.add_argument("--roi", action="store_true",
+                        help="Detect on a low-resolution frame, then at full resolution around the ball")
+    parser.add_argument("--backend", choices=["torch", "onnx", "openvino"], default="torch",
+                        help="Detector runtime; onnx/openvino need a model built with export_model.py")
+    parser.add_argument("--int8", action="store_true", help="Use the INT8 quantized export (onnx/openvino)")
+    parser.add_argument("--threads", type=int, help="Intra-op CPU threads for the detector")
+    parser.add_argument("--scene-analysis", action="store_true",
+                        help="Reuse detections on unchanged frames and split tracking and attribution at scene cuts")
+    parser.add_argument("--teams", action="store_true",
+                        help="Cluster tracks by shirt colour and prefer a receiver from the passer's team over a nearby opponent")
+    parser.add_argument("--tracker", choices=["norfair", "bytetrack"], default="norfair",
+                        help="Player tracker; bytetrack matches whole boxes by IoU and gives OCR real player crops")
+
+def processing_options(parser, args):
+    """Check the options added by add_processing_arguments and turn them into process_events keyword arguments.
+
+    Args:
+        parser (argparse.ArgumentParser): Parser to report invalid combinations through
+        args (argparse.Namespace): Parsed arguments
+
+    Returns:
+        dict: window, pipeline, queue_size, stream_windows, detect_workers,
+            stage_timings and predictor_options
+    """
+    if args.stream_windows and args.pipeline:
+        parser.error("--stream-windows and --pipeline cannot be combined")
+    if args.detect_workers > 1 and args.pipeline:
+        parser.error("--detect-workers and --pipeline cannot be combined")
+    predictor_options = {'pose_guided_ocr': args.pose,
+                         'contact_localization': not args.last_frame,
+                         'keyframe_interval': args.detect_every,
+                         'roi_detection': args.roi,
+                         'detector_backend': args.backend,
+                         'detector_int8': args.int8,
+                         'detector_threads': args.threads,
+                         'scene_analysis': args.scene_analysis,
+                         'team_pruning': args.teams,
+                         'tracker_backend': args.tracker}
+    return dict(window=args.window, pipeline=args.pipeline, queue_size=args.queue_size,
+                stream_windows=args.stream_windows, detect_workers=args.detect_workers,
+                stage_timings=args.stage_timings, predictor_options=predictor_options)
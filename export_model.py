@@ -0,0 +1,113 @@
+import argparse
+import os
+import shutil
+import cv2
+import numpy as np
+from video_utils import VideoFrameReader
+from cpu_backend import exported_model_path, to_input_tensor
+
+def calibration_batches(video_path, frames=200, imgsz=640):
+    """Sample frames evenly across a match video as calibration inputs.
+
+    Args:
+        video_path (str): Match video representative of production footage
+        frames (int): Number of frames to sample
+        imgsz (int): Model input size
+
+    Returns:
+        list: (1, 3, imgsz, imgsz) float32 input tensors
+    """
+    reader = VideoFrameReader(video_path, cache_size=1)
+    if not reader.is_opened():
+        raise RuntimeError(f"Could not open calibration video {video_path}")
+    total = int(reader.cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    batches = []
+    for frame_idx in np.linspace(0, max(total - 1, 0), frames).astype(int):
+        frame = reader.read(int(frame_idx))
+        if frame is not None:
+            batches.append(to_input_tensor([frame], imgsz)[0])
+    reader.release()
+    if not batches:
+        raise RuntimeError(f"No frames could be read from {video_path}")
+    return batches
+
+def export_onnx(model_path, imgsz=640, int8=False, calibration_video=None, calibration_frames=200):
+    """Export YOLOv8 weights to ONNX, optionally with static INT8 quantization.
+
+    Returns:
+        str: Path of the exported model (see cpu_backend.exported_model_path)
+    """
+    from ultralytics import YOLO
+
+    fp32_path = exported_model_path(model_path, 'onnx')
+    exported = YOLO(model_path).export(format='onnx', imgsz=imgsz, dynamic=True, simplify=True)
+    if os.path.abspath(exported) != os.path.abspath(fp32_path):
+        shutil.move(exported, fp32_path)
+    if not int8:
+        return fp32_path
+
+    from onnxruntime.quantization import CalibrationDataReader, QuantFormat, QuantType, quantize_static
+    from onnxruntime.quantization.shape_inference import quant_pre_process
+
+    class VideoCalibration(CalibrationDataReader):
+        def __init__(self, input_name, batches):
+            self.inputs = iter([{input_name: batch} for batch in batches])
+
+        def get_next(self):
+            return next(self.inputs, None)
+
+    import onnxruntime as ort
+    input_name = ort.InferenceSession(fp32_path, providers=['CPUExecutionProvider']).get_inputs()[0].name
+    batches = calibration_batches(calibration_video, calibration_frames, imgsz)
+    prepared_path = fp32_path.replace('.onnx', '-prep.onnx')
+    quant_pre_process(fp32_path, prepared_path)
+    int8_path = exported_model_path(model_path, 'onnx', int8=True)
+    # Per-channel QDQ weights with INT8 activations is what ORT's CPU kernels run fastest
+    quantize_static(prepared_path, int8_path, VideoCalibration(input_name, batches),
+                    quant_format=QuantFormat.QDQ, per_channel=True,
+                    activation_type=QuantType.QInt8, weight_type=QuantType.QInt8)
+    os.remove(prepared_path)
+    return int8_path
+
+def export_openvino(model_path, imgsz=640, int8=False, calibration_video=None, calibration_frames=200):
+    """Export YOLOv8 weights to OpenVINO IR, optionally quantized to INT8 with NNCF.
+
+    Returns:
+        str: Path of the exported model directory
+    """
+    from ultralytics import YOLO
+
+    fp32_path = exported_model_path(model_path, 'openvino')
+    exported = YOLO(model_path).export(format='openvino', imgsz=imgsz, dynamic=True)
+    if os.path.abspath(exported) != os.path.abspath(fp32_path):
+        shutil.rmtree(fp32_path, ignore_errors=True)
+        shutil.move(exported, fp32_path)
+    if not int8:
+        return fp32_path
+
+    import nncf
+    import openvino as ov
+
+    xml = next(os.path.join(fp32_path, name) for name in sorted(os.listdir(fp32_path)) if name.endswith('.xml'))
+    batches = calibration_batches(calibration_video, calibration_frames, imgsz)
+    # The box decoding ops in the detection head lose the most accuracy in INT8; keep them in float
+    quantized = nncf.quantize(ov.Core().read_model(xml), nncf.Dataset(batches),
+                              preset=nncf.QuantizationPreset.MIXED,
+                              ignored_scope=nncf.IgnoredScope(types=['Multiply', 'Subtract', 'Sigmoid']))
+    int8_path = exported_model_path(model_path, 'openvino', int8=True)
+    os.makedirs(int8_path, exist_ok=True)
+    ov.save_model(quantized, os.path.join(int8_path, os.path.basename(xml)))
+    return int8_path
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export YOLOv8 weights for the CPU detector backends")
+    parser.add_argument("--weights", default="yolov8n.pt", help="YOLOv8 .pt weights")
+    parser.add_argument("--format", choices=["onnx", "openvino"], default="onnx")
+    parser.add_argument("--imgsz", type=int, default=640)
+    parser.add_argument("--int8", action="store_true", help="Also build an INT8 model calibrated on --calibration-video")
+    parser.add_argument("--calibration-video", default="match_clip_01.mp4")
+    parser.add_argument("--calibration-frames", type=int, default=200)
+    args = parser.parse_args()
+    export = export_onnx if args.format == "onnx" else export_openvino
+    path = export(args.weights, args.imgsz, args.int8, args.calibration_video, args.calibration_frames)
+    print(f"Exported model written to {path}")
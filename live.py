@@ -0,0 +1,221 @@
+import csv
+import os
+import queue
+import sys
+import threading
+import time
+from collections import OrderedDict
+import cv2
+from video_utils import parse_timestamp, window_bounds
+from predictor import track_batch, attribute_kept, get_player_tracker, warm_up_models, configure
+from event_processor import format_timestamp_hms
+
+def read_event_feed(source, events, follow=True, poll=0.2):
+    """Feed (timestamp in seconds, event) pairs from a line-delimited event source into a queue.
+
+    Lines are `timestamp,event` as in eval.csv; a header line and blank lines
+    are skipped. None is queued when the feed ends.
+
+    Args:
+        source (str): Path of an event file, or '-' for stdin
+        events (queue.Queue): Queue receiving the events
+        follow (bool): Keep waiting for lines appended to a file (like tail -f);
+            stdin always ends at EOF
+        poll (float): Seconds between checks for new lines when following
+    """
+    try:
+        f = sys.stdin if source == '-' else open(source)
+    except OSError as e:
+        print(f"Error opening event feed {source}: {e}", file=sys.stderr)
+        events.put(None)
+        return
+    following = follow and source != '-'
+    pending = ''  # Text of a line that is still being written
+    try:
+        while True:
+            chunk = f.readline()
+            if not chunk:
+                if not following:
+                    break
+                time.sleep(poll)
+                continue
+            pending += chunk
+            if following and not pending.endswith('\n'):
+                # Half-written line at the end of the file; the rest follows on a later read
+                continue
+            line, pending = pending.strip(), ''
+            if not line or line.lower().startswith('timestamp'):
+                continue
+            try:
+                timestamp, event = line.split(',', 1)
+                events.put((parse_timestamp(timestamp.strip()), event.strip()))
+            except ValueError:
+                print(f"Skipping malformed event line: {line}", file=sys.stderr)
+    finally:
+        if f is not sys.stdin:
+            f.close()
+        events.put(None)
+
+class LiveVideoSource:
+    def __init__(self, source, follow=True):
+        """Read frames in order from a stream URL or a video file that is still being written.
+
+        A stream (rtsp://, udp://, http://, a device) blocks in read() until
+        the next frame arrives. A growing file returns no frame at its current
+        end; with follow, it is reopened and repositioned at the next frame, so
+        frames appended since are picked up. Use a container that is readable
+        while being written (MPEG-TS, fragmented MP4, MKV).
+
+        Args:
+            source (str): Stream URL or path of the growing video file
+            follow (bool): Reopen a file at its end to wait for more frames
+        """
+        self.source = source
+        self.follow = follow and os.path.exists(source)
+        self.cap = cv2.VideoCapture(source)
+        self.fps = self.cap.get(cv2.CAP_PROP_FPS) if self.cap.isOpened() else 0.0
+        self.position = 0  # Index of the next frame
+
+    def is_opened(self):
+        return self.cap.isOpened()
+
+    def read(self):
+        """Get the next frame, or None if none is available right now."""
+        ret, frame = self.cap.read()
+        if not ret and self.follow:
+            # The capture stops at the file end it saw when opened; reopen to see appended frames
+            self.cap.release()
+            self.cap = cv2.VideoCapture(self.source)
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, self.position)
+            ret, frame = self.cap.read()
+        if not ret:
+            return None
+        self.position += 1
+        return frame
+
+    def release(self):
+        self.cap.release()
+
+def run_live(event_source, video_source, output_csv=None, window=1.0, batch_size=4, history_seconds=60,
+             idle_timeout=10.0, poll=0.1, follow=True, predictor_options=None):
+    """Attribute events live, emitting each result as soon as its post-event window has been processed.
+
+    Frames are decoded, detected and tracked as they arrive, in small batches.
+    Only a rolling history of history_seconds is kept: per-frame ball boxes,
+    tracks and crops of the players nearest the ball (see predictor.track_batch).
+    An event is attributed once the frame `window` seconds after it has been
+    processed. Its result row is printed to stdout straight away and appended
+    to output_csv. Latency is the time from the event being both received and
+    its window being available to its row being written.
+
+    Stops when the event feed has ended and every event is answered, or when no
+    frame has arrived for idle_timeout seconds (remaining events are then
+    attributed on the frames available).
+
+    Args:
+        event_source (str): Event file or '-' for stdin, see read_event_feed
+        video_source (str): Stream URL or growing video file, see LiveVideoSource
+        output_csv (str): File result rows are appended to, or None for stdout only
+        window (float): Seconds of video on each side of an event
+        batch_size (int): Frames per detection batch; smaller means lower delay
+        history_seconds (float): Seconds of processed video kept for late events
+        idle_timeout (float): Seconds without new frames before giving up on the video
+        poll (float): Seconds to wait when neither frames nor events are available
+        follow (bool): Keep following a growing video file and event file
+        predictor_options (dict): Passed to predictor.configure()
+    """
+    configure(**(predictor_options or {}))
+    video = LiveVideoSource(video_source, follow)
+    if not video.is_opened():
+        print(f"Error: Could not open video {video_source}")
+        return
+    fps = video.fps or 25.0
+    warm_up_models(background=False)
+    history_frames = int(history_seconds * fps)
+    tracker = get_player_tracker()
+    tracker.history_frames = max(tracker.history_frames, history_frames)
+
+    events = queue.Queue()
+    threading.Thread(target=read_event_feed, args=(event_source, events, follow), name='event-feed', daemon=True).start()
+
+    output = None
+    if output_csv:
+        write_header = not os.path.exists(output_csv) or os.path.getsize(output_csv) == 0
+        output = open(output_csv, 'a', newline='')
+        if write_header:
+            csv.writer(output).writerow(['timestamp', 'event', 'player', 'receiver', 'latency'])
+            output.flush()
+    print('timestamp,event,player,receiver,latency', flush=True)
+
+    history = OrderedDict()  # frame index -> (ball box, kept crops)
+    pending = []  # (timestamp, event, time received)
+    batch = []
+    processed = 0  # Frames detected and tracked so far
+    feed_done = False
+    last_frame_time = time.time()
+
+    def emit(timestamp, event, received, ready_at):
+        start, end = window_bounds(timestamp, fps, window)
+        indices = [i for i in range(start, end + 1) if i in history]
+        kept = [history[i] for i in range(indices[0], indices[-1] + 1)] if indices else []
+        player, receiver = attribute_kept(event, kept, indices[0] if indices else start, int(timestamp * fps))
+        latency = round(time.time() - max(received, ready_at), 3)
+        row = [format_timestamp_hms(timestamp), event, player,
+               receiver if event.lower() == 'pass' else 'NONE', latency]
+        print(','.join(str(value) for value in row), flush=True)
+        if output is not None:
+            csv.writer(output).writerow(row)
+            output.flush()
+
+    batch_done = time.time()  # When the most recent batch finished processing
+    try:
+        while True:
+            while True:
+                try:
+                    item = events.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    feed_done = True
+                else:
+                    pending.append(item + (time.time(),))
+
+            frame = video.read()
+            if frame is not None:
+                batch.append(frame)
+                last_frame_time = time.time()
+            if batch and (len(batch) >= batch_size or frame is None):
+                last_ball = next((ball for ball, _ in reversed(history.values()) if ball is not None), None)
+                for frame_idx, kept in enumerate(track_batch(batch, processed, last_ball=last_ball), processed):
+                    history[frame_idx] = kept
+                processed += len(batch)
+                batch = []
+                batch_done = time.time()
+                while len(history) > history_frames:
+                    history.popitem(last=False)
+
+            # Answer every event whose post-event window has been processed, oldest first
+            pending.sort(key=lambda item: item[0])
+            still_pending = []
+            for timestamp, event, received in pending:
+                if window_bounds(timestamp, fps, window)[1] < processed:
+                    emit(timestamp, event, received, batch_done)
+                else:
+                    still_pending.append((timestamp, event, received))
+            pending = still_pending
+
+            if frame is None:
+                if feed_done and not pending:
+                    break
+                if time.time() - last_frame_time > idle_timeout:
+                    # The video stopped: answer what is left with the frames we have
+                    for timestamp, event, received in pending:
+                        emit(timestamp, event, received, last_frame_time)
+                    break
+                time.sleep(poll)
+            elif feed_done and not pending:
+                break
+    finally:
+        video.release()
+        if output is not None:
+            output.close()
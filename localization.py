@@ -0,0 +1,87 @@
+import numpy as np
+
+def ball_trajectory(ball_boxes):
+    """Build a per-frame ball trajectory from per-frame ball boxes.
+
+    Args:
+        ball_boxes (list): Ball box [x1, y1, x2, y2] or None per frame
+
+    Returns:
+        tuple: ((T, 2) ball centers with gaps linearly interpolated (edges held),
+            (T,) bool mask of frames where the ball was actually detected),
+            or (None, mask) if the ball was never detected
+    """
+    observed = np.array([box is not None for box in ball_boxes], dtype=bool)
+    if not observed.any():
+        return None, observed
+    frames = np.flatnonzero(observed)
+    boxes = np.array([ball_boxes[i] for i in frames], dtype=np.float32)
+    centers = (boxes[:, :2] + boxes[:, 2:]) / 2
+    t = np.arange(len(ball_boxes))
+    trajectory = np.stack([np.interp(t, frames, centers[:, 0]), np.interp(t, frames, centers[:, 1])], axis=1)
+    return trajectory, observed
+
+def contact_scores(trajectory, observed, smooth=3):
+    """Score each frame by how sharply the ball's velocity changes there.
+
+    The score is the magnitude of the change in velocity (covering both a
+    change of speed and a change of direction) relative to the typical speed
+    in the window, so kicks and traps stand out from steady rolling.
+
+    Returns:
+        np.ndarray: (T,) scores, zero at the window edges and at frames where
+            the ball was not detected
+    """
+    scores = np.zeros(len(trajectory), dtype=np.float32)
+    if len(trajectory) < 3:
+        return scores
+    if smooth > 1 and len(trajectory) >= smooth:
+        kernel = np.ones(smooth, dtype=np.float32) / smooth
+        padded = np.pad(trajectory, ((smooth // 2, smooth - 1 - smooth // 2), (0, 0)), mode='edge')
+        trajectory = np.stack([np.convolve(padded[:, k], kernel, mode='valid') for k in range(2)], axis=1)
+    velocity = np.diff(trajectory, axis=0)
+    speed = np.linalg.norm(velocity, axis=1)
+    change = np.linalg.norm(np.diff(velocity, axis=0), axis=1)
+    scores[1:-1] = change / (np.median(speed) + 1.0)
+    scores[~observed] = 0
+    return scores
+
+def find_contacts(scores, min_score=0.5):
+    """Frames that are local maxima of the contact score above min_score, in frame order."""
+    if len(scores) < 3:
+        return np.empty(0, dtype=np.int64)
+    inner = scores[1:-1]
+    peaks = (inner >= scores[:-2]) & (inner > scores[2:]) & (inner >= min_score)
+    return np.flatnonzero(peaks) + 1
+
+def localize_contacts(ball_boxes, event_offset, min_score=0.5, min_gap=3):
+    """Find the passer's contact frame and the receiver's frame in an event window.
+
+    The passer's contact is the detected velocity change closest to the event
+    time. The receiver's frame is the next contact at least min_gap frames
+    later, or the last frame the ball was seen if the ball was never stopped
+    inside the window.
+
+    Args:
+        ball_boxes (list): Ball box [x1, y1, x2, y2] or None per frame of the window
+        event_offset (int): Offset of the event timestamp inside the window
+        min_score (float): Minimum contact score, see contact_scores
+        min_gap (int): Minimum frames between the passer's and receiver's contacts
+
+    Returns:
+        tuple: (passer offset, receiver offset) within the window, or None if
+            the ball was never detected
+    """
+    trajectory, observed = ball_trajectory(ball_boxes)
+    if trajectory is None:
+        return None
+    seen = np.flatnonzero(observed)
+    contacts = find_contacts(contact_scores(trajectory, observed), min_score)
+    if len(contacts):
+        passer = int(contacts[np.argmin(np.abs(contacts - event_offset))])
+    else:
+        # No clear kick: fall back to the detection closest to the event time
+        passer = int(seen[np.argmin(np.abs(seen - event_offset))])
+    later = contacts[contacts >= passer + min_gap]
+    receiver = int(later[0]) if len(later) else int(seen[-1])
+    return passer, receiver
@@ -1,8 +1,27 @@
-import sys
-from event_processor import process_events
+import argparse
+from event_processor import process_events, process_events_from_store, add_processing_arguments, processing_options
+from live import run_live
 
 if __name__ == "__main__":
-    if len(sys.argv) < 2:
-        print("Usage: python main.py eval.csv")
+    parser = argparse.ArgumentParser(description="Attribute soccer events to players", usage="python main.py eval.csv")
+    parser.add_argument("event_csv", help="CSV with timestamp and event columns ('-' for stdin with --live)")
+    parser.add_argument("--video", default="match_clip_01.mp4", help="Match video")
+    parser.add_argument("--output", default="submission.csv", help="Output CSV")
+    parser.add_argument("--track-store", help="Answer events from a store built by precompute.py instead of the video")
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes, each handling a contiguous time segment")
+    add_processing_arguments(parser)
+    parser.add_argument("--trace", help="Write per-stage spans of every event as a Chrome trace JSON file")
+    parser.add_argument("--resume", action="store_true",
+                        help="Checkpoint finished events to <output>.partial and skip those already there")
+    parser.add_argument("--live", action="store_true",
+                        help="Follow a growing video or stream and an event feed, appending each result as it resolves")
+    args = parser.parse_args()
+    options = processing_options(parser, args)
+    if args.live:
+        run_live(args.event_csv, args.video, args.output, window=args.window,
+                 predictor_options=options['predictor_options'])
+    elif args.track_store:
+        process_events_from_store(args.event_csv, args.track_store, args.output, window=args.window)
     else:
-        process_events(sys.argv[1], "match_clip_01.mp4", "submission.csv") 
\ No newline at end of file
+        process_events(args.event_csv, args.video, args.output, workers=args.workers, trace_path=args.trace,
+                       resume=args.resume, **options)
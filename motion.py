@@ -0,0 +1,171 @@
+import threading
+from collections import OrderedDict
+import cv2
+import numpy as np
+
+def to_gray(frame, width=None):
+    """Convert a BGR frame to grayscale, optionally downscaled to the given width."""
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    if width is not None and gray.shape[1] > width:
+        height = max(1, int(round(gray.shape[0] * width / gray.shape[1])))
+        gray = cv2.resize(gray, (width, height), interpolation=cv2.INTER_AREA)
+    return gray
+
+def frame_motion(gray_a, gray_b):
+    """Mean absolute difference between two grayscale frames, scaled to [0, 1]."""
+    return float(cv2.absdiff(gray_a, gray_b).mean()) / 255.0
+
+def _box_points(boxes, grid=3, inset=0.2):
+    # A grid x grid lattice of points inside the inner part of every box
+    steps = np.linspace(inset, 1 - inset, grid, dtype=np.float32)
+    fx, fy = np.meshgrid(steps, steps)
+    fx, fy = fx.ravel(), fy.ravel()
+    x = boxes[:, None, 0] + fx[None, :] * (boxes[:, None, 2] - boxes[:, None, 0])
+    y = boxes[:, None, 1] + fy[None, :] * (boxes[:, None, 3] - boxes[:, None, 1])
+    return np.stack([x, y], axis=2).reshape(-1, 1, 2).astype(np.float32)
+
+def propagate_detections(prev_gray, gray, dets, grid=3, max_error=1.0, min_points=3):
+    """Carry detections from one frame to the next with sparse optical flow.
+
+    A small lattice of points inside every box is tracked with pyramidal
+    Lucas-Kanade in both directions; points whose forward-backward error is
+    above max_error are discarded and each box moves by the median
+    displacement of its remaining points. All boxes share one flow call.
+
+    Args:
+        prev_gray (np.ndarray): Grayscale frame the detections belong to
+        gray (np.ndarray): Grayscale frame to move them to
+        dets (np.ndarray): (N, 6) detections [x1, y1, x2, y2, confidence, class]
+        grid (int): Points per box side
+        max_error (float): Largest forward-backward error in pixels for a usable point
+        min_points (int): Usable points a box needs to be carried forward
+
+    Returns:
+        tuple: ((M, 6) propagated detections, confidence scaled by the share of
+            usable points; quality in [0, 1], the mean share over all boxes)
+    """
+    if len(dets) == 0:
+        return dets, 1.0
+    points = _box_points(dets[:, :4], grid)
+    lk = dict(winSize=(15, 15), maxLevel=2,
+              criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 10, 0.03))
+    forward, status, _ = cv2.calcOpticalFlowPyrLK(prev_gray, gray, points, None, **lk)
+    backward, back_status, _ = cv2.calcOpticalFlowPyrLK(gray, prev_gray, forward, None, **lk)
+    error = np.linalg.norm((backward - points).reshape(-1, 2), axis=1)
+    usable = (status.ravel() == 1) & (back_status.ravel() == 1) & (error <= max_error)
+    usable = usable.reshape(len(dets), -1)
+    shift = (forward - points).reshape(len(dets), -1, 2)
+    # Median over usable points only; boxes without any come out as NaN and are dropped
+    shift = np.where(usable[..., None], shift, np.nan)
+    counts = usable.sum(axis=1)
+    keep = counts >= min_points
+    share = counts / usable.shape[1]
+    moved = dets[keep].copy()
+    if len(moved):
+        offset = np.nanmedian(shift[keep], axis=1)
+        moved[:, [0, 2]] += offset[:, None, 0]
+        moved[:, [1, 3]] += offset[:, None, 1]
+        moved[:, 4] *= share[keep]
+    return moved, float(share.mean())
+
+class FrameChangeAnalyzer:
+    def __init__(self, cut_threshold=0.4, cut_motion=0.2, cut_ratio=6.0, min_cut_motion=0.02, width=64, history=2048):
+        """Spot hard scene cuts from tiny thumbnails, remembering results per frame index.
+
+        Every frame is shrunk once to a `width`-pixel thumbnail, kept as
+        grayscale plus a hue/saturation histogram. A frame is a cut when its
+        histogram differs sharply from the previous frame's (a different shot,
+        a replay or studio graphic), or when the thumbnail changes far more than
+        it has been changing per frame within the current shot (a cut between
+        two similar-looking views of the pitch). Results are remembered by frame
+        index, so a frame analysed during detection is not analysed again for
+        tracking, and a batch is compared with the last frame of the batch before it.
+
+        Args:
+            cut_threshold (float): Bhattacharyya distance between histograms (0-1) that marks a cut
+            cut_motion (float): Thumbnail difference (0-1, see frame_motion) that always marks a cut
+            cut_ratio (float): Multiple of the shot's running per-frame difference that marks a cut
+            min_cut_motion (float): Smallest thumbnail difference cut_ratio can flag
+            width (int): Thumbnail width in pixels
+            history (int): Frame indices remembered
+        """
+        self.cut_threshold = cut_threshold
+        self.cut_motion = cut_motion
+        self.cut_ratio = cut_ratio
+        self.min_cut_motion = min_cut_motion
+        self.width = width
+        self.history = history
+        self._frames = OrderedDict()  # frame idx -> (thumbnail, histogram, is cut, running motion)
+        # The pipeline analyses in its detect thread and looks cuts up in the attribution thread
+        self._lock = threading.Lock()
+
+    def _signature(self, frame):
+        height = max(1, int(round(frame.shape[0] * self.width / frame.shape[1])))
+        small = cv2.resize(frame, (self.width, height), interpolation=cv2.INTER_AREA)
+        hist = cv2.calcHist([cv2.cvtColor(small, cv2.COLOR_BGR2HSV)], [0, 1], None, [16, 4], [0, 180, 0, 256])
+        return cv2.cvtColor(small, cv2.COLOR_BGR2GRAY), cv2.normalize(hist, hist, 1, 0, cv2.NORM_L1)
+
+    def _compare(self, previous, thumbnail, hist):
+        # Returns (is cut, running per-frame motion of the shot, None right after a cut)
+        if previous is None:
+            return False, None
+        motion = frame_motion(previous[0], thumbnail)
+        level = previous[3]
+        cut = (cv2.compareHist(previous[1], hist, cv2.HISTCMP_BHATTACHARYYA) > self.cut_threshold
+               or motion > self.cut_motion
+               or (level is not None and motion > max(self.min_cut_motion, self.cut_ratio * level)))
+        if cut:
+            return True, None
+        return False, motion if level is None else 0.9 * level + 0.1 * motion
+
+    def analyze(self, frames, start_frame=None):
+        """Analyse consecutive frames.
+
+        Args:
+            frames (list): Consecutive frames in BGR format
+            start_frame (int): Frame index of frames[0]; None analyses the frames
+                on their own, without remembering them
+
+        Returns:
+            tuple: (grayscale thumbnails, bool cut flags), one per frame
+        """
+        thumbnails, cuts = [], []
+        previous = None if start_frame is None else self._frames.get(start_frame - 1)
+        for i, frame in enumerate(frames):
+            known = None if start_frame is None else self._frames.get(start_frame + i)
+            if known is None:
+                thumbnail, hist = self._signature(frame)
+                known = (thumbnail, hist) + self._compare(previous, thumbnail, hist)
+                if start_frame is not None:
+                    with self._lock:
+                        self._frames[start_frame + i] = known
+                        if len(self._frames) > self.history:
+                            self._frames.popitem(last=False)
+            previous = known
+            thumbnails.append(known[0])
+            cuts.append(known[2])
+        return thumbnails, cuts
+
+    def cuts_between(self, start, end):
+        """Get the offsets from start of remembered cuts in the inclusive range [start, end]."""
+        with self._lock:
+            return [frame_idx - start for frame_idx in range(start, end + 1)
+                    if frame_idx in self._frames and self._frames[frame_idx][2]]
+
+    def clear(self):
+        self._frames.clear()
+
+def shot_bounds(cuts, offset, length):
+    """Get the inclusive range of offsets that are in the same shot as `offset`.
+
+    Args:
+        cuts (list): Offsets of the frames that start a new shot
+        offset (int): Offset of the frame of interest (e.g. the event)
+        length (int): Number of frames
+
+    Returns:
+        tuple: (first, last) offsets of the shot
+    """
+    first = max([cut for cut in cuts if cut <= offset], default=0)
+    last = min([cut - 1 for cut in cuts if cut > offset], default=length - 1)
+    return first, last
@@ -1,8 +1,86 @@
-import torch
 import cv2
 import numpy as np
-from parseq import PARSeq
-from PIL import Image
+from profiling import timed
+
+# PARSeq input size (width, height)
+INPUT_SIZE = (128, 32)
+
+def _clean_number(text):
+    # Keep only digits
+    text = ''.join(c for c in text if c.isdigit())
+    return text if text else 'NONE'
+
+def prepare_crop_batch(frame_crops, buffer=None):
+    """Cut, resize and RGB-convert crops into one uint8 (N, 32, 128, 3) batch.
+    
+    Args:
+        frame_crops (list): (frame, bbox) pairs, frame in BGR format
+        buffer (np.ndarray): Batch buffer to fill; replaced by a larger one if too small
+        
+    Returns:
+        tuple: (buffer, indices of the crops written to its first rows, in order;
+            crops with no pixels inside their frame are skipped)
+    """
+    if buffer is None or len(buffer) < len(frame_crops):
+        buffer = np.empty((len(frame_crops), INPUT_SIZE[1], INPUT_SIZE[0], 3), dtype=np.uint8)
+    valid = []
+    for i, (frame, bbox) in enumerate(frame_crops):
+        height, width = frame.shape[:2]
+        x1, y1, x2, y2 = map(int, bbox)
+        region = frame[max(0, y1):min(height, y2), max(0, x1):min(width, x2)]
+        if region.size == 0:
+            continue
+        # Resize and convert straight into the preallocated batch buffer
+        slot = buffer[len(valid)]
+        cv2.resize(region, INPUT_SIZE, dst=slot, interpolation=cv2.INTER_CUBIC)
+        cv2.cvtColor(slot, cv2.COLOR_BGR2RGB, dst=slot)
+        valid.append(i)
+    return buffer, valid
+
+class JerseyVoteCache:
+    def __init__(self, min_reads=3, max_reads=8, settle_share=0.7):
+        """Per-track jersey number votes that stop OCR once a number is settled.
+        
+        Each read adds its confidence to the recognized number's score. A track
+        is settled once it has min_reads reads and the leading number holds
+        settle_share of the total score, or once it reaches max_reads.
+        
+        Args:
+            min_reads (int): Reads required before a track can settle
+            max_reads (int): Reads after which a track is settled regardless
+            settle_share (float): Share of the total score the leader needs to settle
+        """
+        self.min_reads = min_reads
+        self.max_reads = max_reads
+        self.settle_share = settle_share
+        self._scores = {}
+        self._reads = {}
+        
+    def needs_read(self, track_key):
+        reads = self._reads.get(track_key, 0)
+        if reads < self.min_reads:
+            return True
+        if reads >= self.max_reads:
+            return False
+        scores = self._scores.get(track_key)
+        if not scores:
+            return True
+        return max(scores.values()) < self.settle_share * sum(scores.values())
+        
+    def add(self, track_key, number, confidence):
+        self._reads[track_key] = self._reads.get(track_key, 0) + 1
+        if number != 'NONE':
+            scores = self._scores.setdefault(track_key, {})
+            scores[number] = scores.get(number, 0.0) + confidence
+            
+    def number(self, track_key):
+        """Get the leading number for a track, or 'NONE' if it has no readable votes."""
+        scores = self._scores.get(track_key)
+        return max(scores, key=scores.get) if scores else 'NONE'
+    
+    def clear(self):
+        self._scores.clear()
+        self._reads.clear()
 
 class JerseyNumberRecognizer:
     def __init__(self, device=None):
@@ -11,12 +89,19 @@ class JerseyNumberRecognizer:
         Args:
             device (str): Device to run inference on ('cuda' or 'cpu')
         """
+        # Deferred so importing this module stays cheap; raises ImportError
+        # here when the OCR stack is not installed
+        import torch
+        from parseq import PARSeq
+        
         if device is None:
             device = 'cuda' if torch.cuda.is_available() else 'cpu'
             
         self.model = PARSeq.from_pretrained('parseq')
         self.model.to(device)
         self.device = device
+        # Reused across calls; grown when a larger batch arrives
+        self._crop_buffer = np.empty((0, INPUT_SIZE[1], INPUT_SIZE[0], 3), dtype=np.uint8)
         
     def preprocess_image(self, img):
         """Preprocess image for PARSeq model.
@@ -27,6 +112,9 @@ class JerseyNumberRecognizer:
         Returns:
             torch.Tensor: Preprocessed image tensor
         """
+        import torch
+        from PIL import Image
+        
         # Convert to RGB
         img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
         
@@ -53,26 +141,45 @@ class JerseyNumberRecognizer:
         Returns:
             str: Recognized number or 'NONE' if recognition fails
         """
-        x1, y1, x2, y2 = map(int, bbox)
-        region = frame[y1:y2, x1:x2]
+        return self.recognize_batch([(frame, bbox)])[0][0]
+    
+    @timed('ocr', 'ocr_crops')
+    def recognize_batch(self, frame_crops):
+        """Recognize jersey numbers in several regions with a single forward pass.
         
-        if region.size == 0:
-            return 'NONE'
+        Args:
+            frame_crops (list): (frame, bbox) pairs, frame in BGR format and
+                bbox as (x1, y1, x2, y2)
             
-        # Preprocess image
-        img = self.preprocess_image(region)
+        Returns:
+            list: (number, confidence) per crop; number is 'NONE' with confidence
+                0.0 when the region is empty or no digits were read
+        """
+        import torch
         
-        # Get prediction
-        with torch.no_grad():
-            pred = self.model(img)
-            
-        # Convert prediction to text
-        text = pred[0]
+        results = [('NONE', 0.0)] * len(frame_crops)
+        self._crop_buffer, valid = prepare_crop_batch(frame_crops, self._crop_buffer)
+        if not valid:
+            return results
         
-        # Clean up prediction (keep only digits)
-        text = ''.join(c for c in text if c.isdigit())
+        batch = torch.from_numpy(self._crop_buffer[:len(valid)]).to(self.device)
+        batch = batch.permute(0, 3, 1, 2).float().div_(255.0)
+        with torch.no_grad():
+            preds = self.model(batch)
         
-        return text if text else 'NONE'
+        for i, (text, confidence) in zip(valid, self._decode(preds)):
+            number = _clean_number(text)
+            results[i] = (number, confidence if number != 'NONE' else 0.0)
+        return results
+    
+    def _decode(self, preds):
+        # strhub-style models return logits decoded by their tokenizer, which also
+        # gives per-character probabilities; otherwise the output is already text
+        tokenizer = getattr(self.model, 'tokenizer', None)
+        if tokenizer is None:
+            return [(text, 1.0) for text in preds]
+        labels, char_probs = tokenizer.decode(preds.softmax(-1))
+        return [(label, float(probs.prod())) for label, probs in zip(labels, char_probs)]
     
     def recognize_from_torso(self, frame, torso_bbox):
         """Recognize jersey number from torso region.
@@ -0,0 +1,117 @@
+import queue
+import threading
+import time
+from video_utils import window_bounds
+from profiling import profiler
+from predictor import detect_window, attribute_window, attribute_single_frame, get_player_detector
+
+_DONE = object()
+
+def _put(q, item, stop):
+    # Blocking put that gives up once the pipeline is shutting down
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+def _get(q, stop):
+    while not stop.is_set():
+        try:
+            return q.get(timeout=0.1)
+        except queue.Empty:
+            continue
+    return _DONE
+
+def run_pipeline(rows, reader, window=1.0, decode_queue_size=2, detect_queue_size=2):
+    """Attribute events with decode, detection and attribution overlapped in separate threads.
+
+    Each stage runs in its own thread and hands work to the next through a
+    bounded queue, so a slow stage back-pressures the ones before it and at
+    most `queue size` decoded windows are held in memory per queue. OpenCV
+    decode and torch inference release the GIL, so stages genuinely overlap.
+
+    Args:
+        rows (list): (index, timestamp in seconds, event) tuples in timestamp order
+        reader (VideoFrameReader): Open reader; only the decode thread uses it
+        window (float): Seconds of video on each side of the event
+        decode_queue_size (int): Decoded windows waiting for detection
+        detect_queue_size (int): Detected windows waiting for attribution
+
+    Yields:
+        tuple: (index, player, receiver, latency) in timestamp order; latency is
+            the time the event spent inside the three stages
+    """
+    fps = reader.fps
+    decoded = queue.Queue(maxsize=decode_queue_size)
+    detected = queue.Queue(maxsize=detect_queue_size)
+    stop = threading.Event()
+    errors = []
+
+    def decode():
+        try:
+            for idx, timestamp, event in rows:
+                start_time = time.time()
+                start, end = window_bounds(timestamp, fps, window)
+                with profiler.event(idx), profiler.span('decode') as counts:
+                    frames = reader.read_window(start, end)
+                    frame = reader.read(int(timestamp * fps)) if not frames else None
+                    counts['decode_frames'] = len(frames)
+                item = (idx, event, start, int(timestamp * fps), frames, frame, time.time() - start_time)
+                if not _put(decoded, item, stop):
+                    return
+        except Exception as e:
+            errors.append(e)
+        finally:
+            _put(decoded, _DONE, stop)
+
+    def detect():
+        try:
+            while True:
+                item = _get(decoded, stop)
+                if item is _DONE:
+                    break
+                idx, event, start, event_frame, frames, frame, elapsed = item
+                start_time = time.time()
+                with profiler.event(idx):
+                    if frames:
+                        window_detections = detect_window(frames, start)
+                    else:
+                        # Empty window: the fallback frame is detected here too, so the
+                        # detector stays on this thread and attribution only runs OCR
+                        window_detections = get_player_detector().get_player_boxes(frame) if frame is not None else []
+                elapsed += time.time() - start_time
+                item = (idx, event, start, event_frame, frames, frame, window_detections, elapsed)
+                if not _put(detected, item, stop):
+                    return
+        except Exception as e:
+            errors.append(e)
+        finally:
+            _put(detected, _DONE, stop)
+
+    threads = [threading.Thread(target=decode, name='decode', daemon=True),
+               threading.Thread(target=detect, name='detect', daemon=True)]
+    for thread in threads:
+        thread.start()
+    try:
+        while True:
+            item = _get(detected, stop)
+            if item is _DONE:
+                break
+            idx, event, start, event_frame, frames, frame, window_detections, elapsed = item
+            start_time = time.time()
+            with profiler.event(idx):
+                if frames:
+                    player, receiver = attribute_window(event, frames, window_detections, start, event_frame)
+                else:
+                    # Empty window: same single-frame fallback as the sequential path
+                    player, receiver = attribute_single_frame(event, frame, window_detections)
+            yield idx, player, receiver, round(elapsed + time.time() - start_time, 3)
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
+    if errors:
+        raise errors[0]
@@ -1,7 +1,11 @@
-import torch
 import cv2
 import numpy as np
-from vitpose_pytorch import ViTPose
+from profiling import timed
+
+# ViTPose input size
+INPUT_SIZE = 256
+# COCO keypoint indices framing the torso
+TORSO_KEYPOINTS = [5, 6, 11, 12]  # left/right shoulder, left/right hip
 
 class PoseEstimator:
     def __init__(self, model_name='vitpose-b', device=None):
@@ -11,12 +15,18 @@ class PoseEstimator:
             model_name (str): ViTPose model variant ('vitpose-b', 'vitpose-l', etc.)
             device (str): Device to run inference on ('cuda' or 'cpu')
         """
+        # Deferred so importing this module stays cheap
+        import torch
+        from vitpose_pytorch import ViTPose
+        
         if device is None:
             device = 'cuda' if torch.cuda.is_available() else 'cpu'
             
         self.model = ViTPose.from_pretrained(model_name)
         self.model.to(device)
         self.device = device
+        # Reused across calls; grown when more players arrive than it holds
+        self._input_buffer = np.empty((0, INPUT_SIZE, INPUT_SIZE, 3), dtype=np.uint8)
         
     def estimate_pose(self, frame, bbox):
         """Estimate pose for a player in the given bounding box.
@@ -28,6 +38,8 @@ class PoseEstimator:
         Returns:
             dict: Pose keypoints and confidence scores
         """
+        import torch
+        
         x1, y1, x2, y2 = map(int, bbox)
         player_img = frame[y1:y2, x1:x2]
         
@@ -59,6 +71,87 @@ class PoseEstimator:
             'scores': keypoints[:, 2]  # confidence scores
         }
     
+    @timed('pose', 'pose_players', arg=1)
+    def estimate_poses(self, frame, bboxes, padding=10):
+        """Estimate poses for all players in a frame with a single forward pass.
+        
+        Args:
+            frame (np.ndarray): Input frame in BGR format
+            bboxes (list): Player bounding boxes [x1, y1, x2, y2], or an (N, 4) array
+            padding (int): Padding added around each torso box
+            
+        Returns:
+            dict: Batched pose data for the N boxes:
+                - keypoints: (N, 17, 2) x, y in frame coordinates
+                - scores: (N, 17) keypoint confidence scores
+                - torso_boxes: (N, 4) int torso boxes clipped to the frame
+                - valid: (N,) bool, False for boxes with no pixels in the frame
+        """
+        import torch
+        
+        boxes = np.asarray(bboxes, dtype=np.float32).reshape(-1, 4)
+        n = len(boxes)
+        height, width = frame.shape[:2]
+        # Integer crop boxes clipped to the frame, as in estimate_pose
+        crops = boxes.astype(np.int64)
+        crops[:, [0, 2]] = np.clip(crops[:, [0, 2]], 0, width)
+        crops[:, [1, 3]] = np.clip(crops[:, [1, 3]], 0, height)
+        valid = (crops[:, 2] > crops[:, 0]) & (crops[:, 3] > crops[:, 1])
+        
+        keypoints = np.zeros((n, 17, 2), dtype=np.float32)
+        scores = np.zeros((n, 17), dtype=np.float32)
+        torso_boxes = np.zeros((n, 4), dtype=np.int64)
+        valid_idx = np.flatnonzero(valid)
+        if len(valid_idx) == 0:
+            return {'keypoints': keypoints, 'scores': scores, 'torso_boxes': torso_boxes, 'valid': valid}
+        
+        if len(self._input_buffer) < len(valid_idx):
+            self._input_buffer = np.empty((len(valid_idx), INPUT_SIZE, INPUT_SIZE, 3), dtype=np.uint8)
+        for slot, i in enumerate(valid_idx):
+            x1, y1, x2, y2 = crops[i]
+            cv2.resize(frame[y1:y2, x1:x2], (INPUT_SIZE, INPUT_SIZE), dst=self._input_buffer[slot])
+        
+        batch = torch.from_numpy(self._input_buffer[:len(valid_idx)]).to(self.device)
+        # BGR -> RGB, HWC -> CHW, scale to [0, 1]
+        batch = batch.flip(-1).permute(0, 3, 1, 2).float().div_(255.0)
+        with torch.no_grad():
+            output = self.model(batch).cpu().numpy()
+        
+        # Map keypoints from model input space back to frame coordinates, all players at once
+        valid_crops = crops[valid_idx].astype(np.float32)
+        scale = (valid_crops[:, 2:] - valid_crops[:, :2]) / INPUT_SIZE
+        keypoints[valid_idx] = output[:, :, :2] * scale[:, None, :] + valid_crops[:, None, :2]
+        scores[valid_idx] = output[:, :, 2]
+        torso_boxes[valid_idx] = self.get_torso_regions(keypoints[valid_idx], frame.shape, padding)
+        
+        return {'keypoints': keypoints, 'scores': scores, 'torso_boxes': torso_boxes, 'valid': valid}
+    
+    @staticmethod
+    def get_torso_regions(keypoints, frame_shape=None, padding=10):
+        """Get torso regions for a batch of poses.
+        
+        Args:
+            keypoints (np.ndarray): (N, 17, 2) keypoints in frame coordinates
+            frame_shape (tuple): Frame shape used to clip the boxes, or None
+            padding (int): Padding added around each torso box
+            
+        Returns:
+            np.ndarray: (N, 4) int torso boxes (x1, y1, x2, y2)
+        """
+        torso = keypoints[:, TORSO_KEYPOINTS]
+        shoulders, hips = torso[:, :2], torso[:, 2:]
+        boxes = np.stack([
+            torso[:, :, 0].min(axis=1) - padding,
+            shoulders[:, :, 1].min(axis=1) - padding,
+            torso[:, :, 0].max(axis=1) + padding,
+            hips[:, :, 1].max(axis=1) + padding,
+        ], axis=1)
+        boxes[:, :2] = np.maximum(boxes[:, :2], 0)
+        if frame_shape is not None:
+            boxes[:, 2] = np.minimum(boxes[:, 2], frame_shape[1])
+            boxes[:, 3] = np.minimum(boxes[:, 3], frame_shape[0])
+        return boxes.astype(np.int64)
+    
     def get_torso_region(self, pose_data):
         """Get the torso region from pose keypoints.
         
@@ -0,0 +1,93 @@
+import argparse
+import os
+import cv2
+from tqdm import tqdm
+from video_utils import VideoFrameReader
+from detection import split_detections, detections_to_dicts, BALL_CLASS
+from detection_cache import DetectionCache
+from tracking import PlayerTracker
+from predictor import get_player_detector, get_jersey_ocr
+from track_store import TrackStoreWriter
+
+def precompute_match(video_path, output_path, batch_size=16, ocr_every=25, ocr_reads=5,
+                     detection_cache_dir='.detection_cache', tracker_backend='norfair'):
+    """Run detection, tracking and jersey OCR over a whole match once and save a TrackStore.
+
+    Args:
+        video_path (str): Path to the match video
+        output_path (str): Directory the TrackStore is written to
+        batch_size (int): Frames per detector forward pass
+        ocr_every (int): Minimum number of frames between OCR reads of the same track
+        ocr_reads (int): Number of OCR reads collected per track for the jersey vote
+        detection_cache_dir (str): Detection cache shared with process_events, or None
+        tracker_backend (str): PlayerTracker backend, 'norfair' or 'bytetrack'
+
+    Returns:
+        TrackStore: The store that was written, or None if the video could not be opened
+    """
+    reader = VideoFrameReader(video_path, cache_size=batch_size)
+    if not reader.is_opened():
+        print(f"Error: Could not open video {video_path}")
+        return None
+    player_detector = get_player_detector()
+    jersey_ocr = get_jersey_ocr()
+    if detection_cache_dir:
+        player_detector.cache = DetectionCache(video_path, player_detector.cache_key(), cache_dir=detection_cache_dir)
+    frame_count = int(reader.cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    tracker = PlayerTracker(backend=tracker_backend)
+    writer = TrackStoreWriter(reader.fps)
+    reads = {}
+    last_read = {}
+    frame_idx = 0
+    with tqdm(total=frame_count or None, unit='frame') as progress:
+        while True:
+            frames = reader.read_window(frame_idx, frame_idx + batch_size - 1)
+            if not frames:
+                break
+            indices = list(range(frame_idx, frame_idx + len(frames)))
+            batch = player_detector.detect_batch(frames, batch_size=batch_size, frame_indices=indices)
+            for idx, frame, dets in zip(indices, frames, batch):
+                _, ball_box = split_detections(dets)
+                tracks = tracker.update(detections_to_dicts(dets), idx)
+                ball_conf = float(dets[dets[:, 5] == BALL_CLASS, 4].max()) if ball_box is not None else 0.0
+                writer.add_frame(idx, tracks, ball_box.tolist() if ball_box is not None else None, ball_conf)
+                if jersey_ocr is None:
+                    continue
+                # A handful of spaced-out reads per track is enough for the jersey vote
+                due = [
+                    track for track in tracks
+                    if reads.get(track['id'], 0) < ocr_reads and idx - last_read.get(track['id'], -ocr_every) >= ocr_every
+                ]
+                if not due:
+                    continue
+                numbers = jersey_ocr.recognize_batch([(frame, track['bbox']) for track in due])
+                for track, (number, _) in zip(due, numbers):
+                    writer.add_jersey(idx, track['id'], number)
+                    reads[track['id']] = reads.get(track['id'], 0) + 1
+                    last_read[track['id']] = idx
+            frame_idx += len(frames)
+            progress.update(len(frames))
+            if len(frames) < batch_size:
+                break
+    reader.release()
+    if player_detector.cache is not None:
+        player_detector.cache.close()
+        player_detector.cache = None
+    store = writer.build()
+    store.save(output_path)
+    print(f"Track store written to {output_path}")
+    return store
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Precompute tracks, ball positions and jersey reads for a match")
+    parser.add_argument("video", help="Match video")
+    parser.add_argument("--output", help="Track store directory (default: <video>.tracks)")
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--ocr-every", type=int, default=25)
+    parser.add_argument("--ocr-reads", type=int, default=5)
+    parser.add_argument("--tracker", choices=["norfair", "bytetrack"], default="norfair",
+                        help="Player tracker; bytetrack matches whole boxes and keeps their real size")
+    args = parser.parse_args()
+    output = args.output or os.path.splitext(args.video)[0] + ".tracks"
+    precompute_match(args.video, output, batch_size=args.batch_size, ocr_every=args.ocr_every, ocr_reads=args.ocr_reads,
+                     tracker_backend=args.tracker)
@@ -1,97 +1,542 @@
-from detection import PlayerDetector
+from detection import PlayerDetector, split_detections, detections_to_dicts, interpolate_ball
 from tracking import PlayerTracker
-try:
-    from ocr import JerseyNumberRecognizer
-except ImportError:
-    JerseyNumberRecognizer = None
+from ocr import JerseyNumberRecognizer, JerseyVoteCache
+from pose import PoseEstimator
+from video_utils import get_video_reader, release_video_readers, window_bounds
+from association import closest_tracks, as_boxes, box_centers, pairwise_iou, pairwise_center_distances
+from localization import localize_contacts, ball_trajectory
+from teams import TeamClassifier, shirt_features
+from motion import FrameChangeAnalyzer, frame_motion, shot_bounds
+import threading
+from profiling import profiler
 import numpy as np
-import cv2
-
-# Initialize detector and OCR (if available)
-player_detector = PlayerDetector()
-player_tracker = PlayerTracker()
-if JerseyNumberRecognizer:
-    jersey_ocr = JerseyNumberRecognizer()
-else:
-    jersey_ocr = None
-
-def get_frames_around_event(video_path, timestamp, window=1.0, fps=20):
-    cap = cv2.VideoCapture(video_path)
-    if not cap.isOpened():
+
+# Models are created on first use (or by warm_up_models) so that importing this
+# module does not pull in torch, ultralytics or the OCR stack
+_player_detector = None
+_player_tracker = None
+_jersey_ocr = None
+_jersey_ocr_loaded = False
+_pose_estimator = None
+_pose_estimator_loaded = False
+_model_lock = threading.Lock()
+# Confidence-weighted jersey reads per (tracker generation, track id)
+jersey_votes = JerseyVoteCache()
+# Shirt-colour clusters per (tracker generation, track id), see team_pruning
+team_clusters = TeamClassifier()
+# Every Nth frame's players are added to team_clusters
+SHIRT_SAMPLE_STRIDE = 5
+# How much farther from the ball a receiver from the passer's team may be than
+# a nearer opponent and still be preferred
+TEAM_PREFERENCE_RATIO = 2.0
+# Thumbnails and scene cuts per frame index, see scene_analysis
+scene_changes = FrameChangeAnalyzer()
+# Attribution options for this process, see configure()
+settings = {
+    'pose_guided_ocr': False,  # OCR the pose-estimated torso instead of the whole track box
+    'contact_localization': True,  # Attribute on ball-contact frames instead of the window's last frame
+    'keyframe_interval': 1,  # Detect every Kth frame and propagate boxes in between (1 = detect every frame)
+    'motion_threshold': 0.08,  # Frame difference to the last keyframe that forces a detection
+    'min_flow_quality': 0.6,  # Share of followed flow points below which a propagated frame is re-detected
+    'roi_detection': False,  # Low-res whole-frame pass, then a full-res pass on a crop around the ball
+    'roi_global_size': 320,  # Model input size of the whole-frame pass
+    'roi_crop_size': 320,  # Side of the crop around the ball in frame pixels (and its model input size)
+    'detector_backend': 'torch',  # 'torch', or 'onnx' / 'openvino' for a model built by export_model.py
+    'detector_int8': False,  # Use the INT8 quantized export
+    'detector_threads': None,  # Intra-op CPU threads for the detector (None = runtime default)
+    'scene_analysis': False,  # Reuse detections on unchanged frames; split tracks and attribution at scene cuts
+    'duplicate_threshold': 0.004,  # Thumbnail difference to the last detected frame below which a frame is unchanged
+    'max_reused_frames': 5,  # Consecutive frames that may reuse one detection
+    'team_pruning': False,  # Prefer receivers from the passer's team over nearby opponents (shirt-colour clusters)
+    'tracker_backend': 'norfair',  # 'norfair', or 'bytetrack' for IoU matching on real boxes (see byte_tracker.py)
+}
+
+def configure(**options):
+    """Set attribution options for this process.
+    
+    Args:
+        **options: Keys of `settings`, e.g. pose_guided_ocr=True
+    """
+    unknown = set(options) - set(settings)
+    if unknown:
+        raise ValueError(f"Unknown predictor options: {sorted(unknown)}")
+    settings.update(options)
+
+def get_player_detector():
+    global _player_detector
+    with _model_lock:
+        if _player_detector is None:
+            roi_sizes = None
+            if settings['roi_detection']:
+                roi_sizes = (settings['roi_global_size'], settings['roi_crop_size'])
+            with profiler.span('model_load'):
+                _player_detector = PlayerDetector(roi_sizes=roi_sizes, backend=settings['detector_backend'],
+                                                  int8=settings['detector_int8'], threads=settings['detector_threads'])
+        return _player_detector
+
+def get_player_tracker():
+    global _player_tracker
+    with _model_lock:
+        if _player_tracker is None:
+            _player_tracker = PlayerTracker(backend=settings['tracker_backend'])
+        return _player_tracker
+
+def get_jersey_ocr():
+    # Returns None when the OCR dependencies or weights are not available
+    global _jersey_ocr, _jersey_ocr_loaded
+    with _model_lock:
+        if not _jersey_ocr_loaded:
+            try:
+                with profiler.span('model_load'):
+                    _jersey_ocr = JerseyNumberRecognizer()
+            except ImportError:
+                _jersey_ocr = None
+            _jersey_ocr_loaded = True
+        return _jersey_ocr
+
+def get_pose_estimator():
+    # Returns None when the pose dependencies or weights are not available
+    global _pose_estimator, _pose_estimator_loaded
+    with _model_lock:
+        if not _pose_estimator_loaded:
+            try:
+                with profiler.span('model_load'):
+                    _pose_estimator = PoseEstimator()
+            except ImportError:
+                _pose_estimator = None
+            _pose_estimator_loaded = True
+        return _pose_estimator
+
+def warm_up_models(background=True, detector=True):
+    """Load the detector, tracker and OCR models ahead of the first event.
+    
+    Args:
+        background (bool): Load in a daemon thread so CSV parsing and video
+            opening overlap with model loading
+        detector (bool): Load the detector too; False when detection runs in
+            other processes (see shared_frames.DetectorPool)
+            
+    Returns:
+        threading.Thread: The loader thread, or None when loading in the foreground
+    """
+    def load():
+        if detector:
+            get_player_detector()
+        get_player_tracker()
+        get_jersey_ocr()
+        if settings['pose_guided_ocr']:
+            get_pose_estimator()
+    if not background:
+        load()
+        return None
+    thread = threading.Thread(target=load, name='model-warm-up', daemon=True)
+    thread.start()
+    return thread
+
+def reset_match_state():
+    # Forget tracks and jersey votes and close the previous video's readers
+    # before a new video; loaded models are kept
+    release_video_readers()
+    with _model_lock:
+        if _player_tracker is not None:
+            _player_tracker.reset()
+    jersey_votes.clear()
+    team_clusters.clear()
+    scene_changes.clear()
+
+def get_frames_around_event(video_path, timestamp, window=1.0, fps=20, reader=None):
+    # Defaults to the process-wide reader for the file, which stays open between calls
+    if reader is None:
+        reader = get_video_reader(video_path)
+    if not reader.is_opened():
         return []
-    frames = []
-    start = max(0, int((timestamp - window) * fps))
-    end = int((timestamp + window) * fps)
-    cap.set(cv2.CAP_PROP_POS_FRAMES, start)
-    for idx in range(start, end+1):
-        ret, frame = cap.read()
-        if not ret:
+    start, end = window_bounds(timestamp, fps, window)
+    return reader.read_window(start, end)
+
+def _no_player(event_type):
+    return ('NONE', 'NONE') if event_type.lower() == 'pass' else ('NONE', None)
+
+def _sample_shirts(frames, start_frame, window_detections, tracker):
+    # Add shirt features of the tracks in every SHIRT_SAMPLE_STRIDE-th frame to
+    # team_clusters. The torso is cut from the detection box under each track
+    # (norfair only reports a small box around the centre), and players whose
+    # box overlaps another player's are skipped, as their crop mixes two shirts
+    for frame_idx, (frame, dets) in enumerate(zip(frames, window_detections), start_frame):
+        tracks = tracker.tracks_at(frame_idx)
+        if frame_idx % SHIRT_SAMPLE_STRIDE or not tracks:
+            continue
+        players, _ = split_detections(dets)
+        if not len(players):
+            continue
+        boxes = as_boxes(players[:, :4])
+        overlap = pairwise_iou(boxes, boxes)
+        np.fill_diagonal(overlap, 0)
+        clear = ~(overlap > 0).any(axis=1)
+        # A track's detection is the box its centre falls in that is nearest its centre
+        distances = pairwise_center_distances([track['bbox'] for track in tracks], boxes)
+        centres = box_centers([track['bbox'] for track in tracks])
+        inside = ((centres[:, None, 0] >= boxes[None, :, 0]) & (centres[:, None, 0] <= boxes[None, :, 2]) &
+                  (centres[:, None, 1] >= boxes[None, :, 1]) & (centres[:, None, 1] <= boxes[None, :, 3]))
+        distances[~inside] = np.inf
+        nearest = distances.argmin(axis=1)
+        claims = np.bincount(nearest[np.isfinite(distances.min(axis=1))], minlength=len(boxes))
+        for track, det, distance in zip(tracks, nearest, distances.min(axis=1)):
+            # Two tracks on one detection cannot both be that player
+            if np.isfinite(distance) and clear[det] and claims[det] == 1:
+                team_clusters.add((tracker.generation, track['id']), shirt_features(frame, boxes[det]), frame_idx)
+
+def _team_lookup(tracker):
+    # Maps a track of the tracker's current generation to its team (see TeamClassifier.team)
+    return lambda track: team_clusters.team((tracker.generation, track['id']))
+
+def _prefer_team(candidates, ball_box, passer_team, team_of):
+    # The receiver candidate nearest the ball, as a list of at most one track.
+    # A candidate known to be on the passer's opposing team gives way to the
+    # nearest one not known to be, if that one is at most TEAM_PREFERENCE_RATIO
+    # times as far from the ball; unknown and 'other' (keepers, referees) are
+    # never passed over
+    ranked = closest_tracks(candidates, ball_box, len(candidates))
+    if not ranked or team_of is None or passer_team is None or passer_team < 0 or team_of(ranked[0]) != 1 - passer_team:
+        return ranked[:1]
+    distances = np.sqrt(pairwise_center_distances([track['bbox'] for track in ranked], ball_box)[:, 0])
+    for track, distance in zip(ranked[1:], distances[1:]):
+        if distance > TEAM_PREFERENCE_RATIO * distances[0]:
             break
-        frames.append(frame)
-    cap.release()
-    return frames
+        if team_of(track) != 1 - passer_team:
+            return [track]
+    return ranked[:1]
 
-def predict_player_for_event(frame, event_type, video_path=None, timestamp=None, fps=20):
-    # If video_path and timestamp are provided, use tracking over a window
-    if video_path is not None and timestamp is not None:
-        frames = get_frames_around_event(video_path, timestamp, window=1.0, fps=fps)
-        all_player_boxes = []
+def attribute_event(event_type, tracked_players, ball_box, read_jerseys, team_of=None):
+    # Pass: the two players closest to the ball are passer and receiver.
+    # Other events: the single closest player. read_jerseys maps a list of
+    # tracks to their numbers in one call so OCR can batch them. team_of maps a
+    # track to its team (or None) to prefer receivers from the passer's team.
+    if ball_box is None or not tracked_players:
+        return _no_player(event_type)
+    if event_type.lower() == 'pass':
+        passer = closest_tracks(tracked_players, ball_box, 1)
+        others = [track for track in tracked_players if track['id'] != passer[0]['id']]
+        receiver = _prefer_team(others, ball_box, team_of(passer[0]) if team_of else None, team_of)
+        numbers = read_jerseys(passer + receiver)
+        return numbers[0], numbers[1] if len(numbers) > 1 else 'NONE'
+    return read_jerseys(closest_tracks(tracked_players, ball_box, 1))[0], None
+
+def predict_player_from_store(event_type, timestamp, store, window=1.0):
+    # Answer an event from a precomputed TrackStore instead of running the models
+    start, end = window_bounds(timestamp, store.fps, window)
+    end = min(end, store.frame_count - 1)
+    if end < start:
+        return _no_player(event_type)
+    if settings['contact_localization']:
+        return attribute_contacts(
+            event_type, [store.ball_at(frame_idx) for frame_idx in range(start, end + 1)],
+            int(timestamp * store.fps) - start,
+            lambda offset: store.tracks_at(start + offset),
+            lambda picks: [store.jersey_for_track(track['id']) for track, _ in picks])
+    return attribute_event(event_type, store.tracks_at(end), store.ball_at(end),
+                           lambda tracks: [store.jersey_for_track(track['id']) for track in tracks])
+
+def _detect_frames(frames, frame_indices):
+    player_detector = get_player_detector()
+    if settings['keyframe_interval'] > 1:
+        return player_detector.detect_sparse(frames, frame_indices, settings['keyframe_interval'],
+                                             settings['motion_threshold'], settings['min_flow_quality'])
+    return player_detector.detect_batch(frames, frame_indices=frame_indices)
+
+def detect_window(frames, start_frame=None):
+    # Batched forward passes over the whole window (or its keyframes); cached frames are skipped
+    frame_indices = None
+    if start_frame is not None:
+        frame_indices = list(range(start_frame, start_frame + len(frames)))
+    if not settings['scene_analysis'] or len(frames) <= 1:
+        return _detect_frames(frames, frame_indices)
+    # Frames (almost) identical to the last detected one reuse its player
+    # detections. The ball is too small to show in the thumbnail difference, so
+    # it is interpolated between detected frames instead, and the last frame is
+    # always detected so every reused frame has a detected frame on each side.
+    thumbnails, cuts = scene_changes.analyze(frames, start_frame)
+    detected = [0]
+    for i in range(1, len(frames)):
+        if (cuts[i] or i == len(frames) - 1 or i - detected[-1] > settings['max_reused_frames']
+                or frame_motion(thumbnails[detected[-1]], thumbnails[i]) >= settings['duplicate_threshold']):
+            detected.append(i)
+    if len(detected) == len(frames):
+        return _detect_frames(frames, frame_indices)
+    results = _detect_frames([frames[i] for i in detected],
+                             [frame_indices[i] for i in detected] if frame_indices is not None else None)
+    by_frame = dict(zip(detected, results))
+    detections = []
+    for i in range(len(frames)):
+        detections.append(by_frame[i] if i in by_frame else detections[-1])
+    return interpolate_ball(detections, detected)
+
+def _read_jerseys(picks, tracker_generation):
+    # picks: (track, frame, bbox) triples, bbox being the track's box in that
+    # frame. OCR only tracks whose number is not settled yet, all in one batch;
+    # returns the current vote leader for every pick.
+    jersey_ocr = get_jersey_ocr()
+    keys = [(tracker_generation, track['id']) for track, _, _ in picks]
+    pending = [i for i, key in enumerate(keys) if jersey_ocr and jersey_votes.needs_read(key)]
+    if pending:
+        crops = [(picks[i][1], picks[i][2]) for i in pending]
+        pose_estimator = get_pose_estimator() if settings['pose_guided_ocr'] else None
+        if pose_estimator is not None:
+            # One pose forward pass per frame covering all of its pending players, then OCR on the torsos
+            by_frame = {}
+            for slot, (frame, _) in enumerate(crops):
+                by_frame.setdefault(id(frame), []).append(slot)
+            for slots in by_frame.values():
+                frame = crops[slots[0]][0]
+                poses = pose_estimator.estimate_poses(frame, [crops[slot][1] for slot in slots])
+                for slot, torso, valid in zip(slots, poses['torso_boxes'], poses['valid']):
+                    if valid:
+                        crops[slot] = (frame, torso)
+        reads = jersey_ocr.recognize_batch(crops)
+        for i, (number, confidence) in zip(pending, reads):
+            jersey_votes.add(keys[i], number, confidence)
+    return [jersey_votes.number(key) for key in keys]
+
+def attribute_contacts(event_type, ball_boxes, event_offset, tracks_at, read_jerseys, team_of=None):
+    # Attribute on the ball-contact frames of the window rather than its last frame.
+    # tracks_at maps a window offset to that frame's tracks; read_jerseys maps a
+    # list of (track, offset) pairs to their numbers in one call; team_of maps
+    # a track to its team (or None) to prefer receivers from the passer's team.
+    contact = localize_contacts(ball_boxes, event_offset)
+    if contact is None:
+        return _no_player(event_type)
+    passer_offset, receiver_offset = contact
+    trajectory, _ = ball_trajectory(ball_boxes)
+
+    def ball_near(offset):
+        # Detected box, or a point box on the interpolated trajectory
+        if ball_boxes[offset] is not None:
+            return ball_boxes[offset]
+        x, y = trajectory[offset]
+        return [x, y, x, y]
+
+    passer = closest_tracks(tracks_at(passer_offset), ball_near(passer_offset), 1)
+    if not passer:
+        return _no_player(event_type)
+    if event_type.lower() != 'pass':
+        return read_jerseys([(passer[0], passer_offset)])[0], None
+    # The receiver is whoever else is nearest the ball when it is next stopped
+    candidates = [track for track in tracks_at(receiver_offset) if track['id'] != passer[0]['id']]
+    receiver = _prefer_team(candidates, ball_near(receiver_offset), team_of(passer[0]) if team_of else None, team_of)
+    picks = [(passer[0], passer_offset)]
+    if receiver:
+        picks.append((receiver[0], receiver_offset))
+    numbers = read_jerseys(picks)
+    return numbers[0], numbers[1] if len(numbers) > 1 else 'NONE'
+
+def attribute_window(event_type, frames, window_detections, start_frame=None, event_frame=None):
+    # Track the window's detections and attribute the event, either on the
+    # localized ball-contact frames or on the last frame of the window
+    if not frames:
+        return _no_player(event_type)
+    with profiler.span('attribute'):
+        player_tracker = get_player_tracker()
+        cuts = []
+        if settings['scene_analysis']:
+            # Before start_frame defaults to 0, so frames of unknown position are not remembered
+            cuts = [offset for offset, cut in enumerate(scene_changes.analyze(frames, start_frame)[1]) if cut]
+        if start_frame is None:
+            # Unknown position in the video: track this window on its own
+            player_tracker.reset()
+            start_frame = 0
+        if event_frame is None:
+            event_frame = start_frame + len(frames) // 2
         all_ball_boxes = []
-        for f in frames:
-            player_boxes = player_detector.get_player_boxes(f)
-            ball_box = player_detector.get_ball_box(f)
-            all_player_boxes.append(player_boxes)
-            all_ball_boxes.append(ball_box)
-        # Flatten player boxes and track
-        tracked_players = player_tracker.get_tracked_players(frames[-1], [box for sublist in all_player_boxes for box in sublist])
+        for dets in window_detections:
+            _, ball_box = split_detections(dets)
+            all_ball_boxes.append(ball_box.tolist() if ball_box is not None else None)
+        # Track frame by frame; tracker state carries over between consecutive events
+        tracked_players = player_tracker.update_sequence(
+            [detections_to_dicts(dets) for dets in window_detections], start_frame, cuts)
+        if settings['team_pruning']:
+            _sample_shirts(frames, start_frame, window_detections, player_tracker)
+        if cuts:
+            # Attribute within the event's shot only; replays and cut-aways in the window are left out
+            event_offset = min(max(event_frame - start_frame, 0), len(frames) - 1)
+            first, last = shot_bounds(cuts, event_offset, len(frames))
+            frames, all_ball_boxes = frames[first:last + 1], all_ball_boxes[first:last + 1]
+            start_frame += first
+            tracked_players = player_tracker.tracks_at(start_frame + len(frames) - 1)
+        team_of = _team_lookup(player_tracker) if settings['team_pruning'] else None
+        if settings['contact_localization']:
+            return attribute_contacts(
+                event_type, all_ball_boxes, event_frame - start_frame,
+                lambda offset: player_tracker.tracks_at(start_frame + offset),
+                lambda picks: _read_jerseys([(track, frames[offset], track['bbox']) for track, offset in picks],
+                                            player_tracker.generation), team_of)
         # Use last frame's ball box
         ball_box = all_ball_boxes[-1]
-        # For pass: associate two closest players to ball
-        if event_type.lower() == 'pass' and ball_box is not None and tracked_players:
-            # Sort players by distance to ball
-            def center(box):
-                x1, y1, x2, y2 = box
-                return ((x1+x2)/2, (y1+y2)/2)
-            bx, by = center(ball_box)
-            dists = [((center(tp['bbox'])[0]-bx)**2 + (center(tp['bbox'])[1]-by)**2, tp) for tp in tracked_players]
-            dists.sort(key=lambda x: x[0])
-            if len(dists) >= 2:
-                p1, p2 = dists[0][1], dists[1][1]
-                jersey1 = jersey_ocr.recognize_number(frames[-1], p1['bbox']) if jersey_ocr else 'NONE'
-                jersey2 = jersey_ocr.recognize_number(frames[-1], p2['bbox']) if jersey_ocr else 'NONE'
-                return jersey1, jersey2
-            elif len(dists) == 1:
-                jersey1 = jersey_ocr.recognize_number(frames[-1], dists[0][1]['bbox']) if jersey_ocr else 'NONE'
-                return jersey1, 'NONE'
-            else:
-                return 'NONE', 'NONE'
-        # For other events: pick closest player to ball
-        elif ball_box is not None and tracked_players:
-            def center(box):
-                x1, y1, x2, y2 = box
-                return ((x1+x2)/2, (y1+y2)/2)
-            bx, by = center(ball_box)
-            dists = [((center(tp['bbox'])[0]-bx)**2 + (center(tp['bbox'])[1]-by)**2, tp) for tp in tracked_players]
-            dists.sort(key=lambda x: x[0])
-            if dists:
-                jersey = jersey_ocr.recognize_number(frames[-1], dists[0][1]['bbox']) if jersey_ocr else 'NONE'
-                return jersey, None
-            else:
-                return 'NONE', None
-        else:
-            return 'NONE', 'NONE' if event_type.lower() == 'pass' else ( 'NONE', None )
+        return attribute_event(event_type, tracked_players, ball_box,
+                               lambda tracks: _read_jerseys([(track, frames[-1], track['bbox']) for track in tracks],
+                                                            player_tracker.generation), team_of)
+
+def _keep_crops(frame, tracks, ball_box, k, padding=8):
+    # Copy out the k tracks nearest the ball, which are the only ones attribution
+    # can pick; returns {track id: (crop, bbox in crop coordinates)}
+    height, width = frame.shape[:2]
+    kept = {}
+    for track in closest_tracks(tracks, ball_box, k):
+        x1, y1, x2, y2 = track['bbox']
+        cx1, cy1 = max(0, int(x1) - padding), max(0, int(y1) - padding)
+        cx2, cy2 = min(width, int(x2) + padding), min(height, int(y2) + padding)
+        if cx2 > cx1 and cy2 > cy1:
+            kept[track['id']] = (frame[cy1:cy2, cx1:cx2].copy(), [x1 - cx1, y1 - cy1, x2 - cx1, y2 - cy1])
+    return kept
+
+def track_batch(frames, start_frame, candidates=4, last_ball=None, window_detections=None):
+    """Detect and track a batch of consecutive frames, keeping only what attribution needs.
+
+    Args:
+        frames (list): Consecutive frames in BGR format; not referenced afterwards
+        start_frame (int): Frame index of the first frame
+        candidates (int): Tracks nearest the ball whose crops are kept per frame
+        last_ball (list): Ball box from before this batch, used for frames without a ball
+        window_detections (list): Detections already computed for the frames
+            (e.g. by a DetectorPool); None runs the detector here
+
+    Returns:
+        list: (ball box or None, {track id: (crop, bbox in crop coordinates)}) per frame
+    """
+    player_tracker = get_player_tracker()
+    if window_detections is None:
+        window_detections = detect_window(frames, start_frame)
+    cuts = []
+    if settings['scene_analysis']:
+        # Remembered by frame index, so attribute_kept can find the event's shot later
+        cuts = [offset for offset, cut in enumerate(scene_changes.analyze(frames, start_frame)[1]) if cut]
+    kept = []
+    with profiler.span('attribute'):
+        player_tracker.update_sequence([detections_to_dicts(dets) for dets in window_detections], start_frame, cuts)
+        if settings['team_pruning']:
+            _sample_shirts(frames, start_frame, window_detections, player_tracker)
+        for frame_idx, (frame, dets) in enumerate(zip(frames, window_detections), start_frame):
+            _, ball_box = split_detections(dets)
+            ball_box = ball_box.tolist() if ball_box is not None else None
+            # Frames without a ball keep the players around where it was last seen
+            last_ball = ball_box or last_ball
+            kept.append((ball_box, _keep_crops(frame, player_tracker.tracks_at(frame_idx), last_ball, candidates)))
+    return kept
+
+def attribute_kept(event_type, kept, start_frame, event_frame, reread=None):
+    """Attribute an event from per-frame results of track_batch.
+
+    Args:
+        event_type (str): Event label, e.g. 'pass'
+        kept (list): (ball box, crops) per frame of the window, from track_batch
+        start_frame (int): Frame index of kept[0]
+        event_frame (int): Frame of the event timestamp
+        reread (callable): Maps a frame index to the frame, for picks whose crop
+            was not kept; None answers 'NONE' for those
+
+    Returns:
+        tuple: (player, receiver) as predict_player_for_event
+    """
+    if not kept:
+        return _no_player(event_type)
+    player_tracker = get_player_tracker()
+    if settings['scene_analysis']:
+        cuts = scene_changes.cuts_between(start_frame, start_frame + len(kept) - 1)
+        if cuts:
+            # Attribute within the event's shot only; replays and cut-aways in the window are left out
+            event_offset = min(max(event_frame - start_frame, 0), len(kept) - 1)
+            first, last = shot_bounds(cuts, event_offset, len(kept))
+            kept = kept[first:last + 1]
+            start_frame += first
+    ball_boxes = [ball_box for ball_box, _ in kept]
+
+    def read_jerseys(picks):
+        # picks: (track, window offset) pairs
+        triples = []
+        for track, offset in picks:
+            crop = kept[offset][1].get(track['id'])
+            if crop is None:
+                # Not near the ball when tracked: decode that frame again if possible
+                crop = (reread(start_frame + offset) if reread else None, track['bbox'])
+            triples.append((track,) + crop)
+        readable = [triple for triple in triples if triple[1] is not None]
+        numbers = iter(_read_jerseys(readable, player_tracker.generation))
+        return [next(numbers) if triple[1] is not None else 'NONE' for triple in triples]
+
+    # Shirts were sampled by track_batch, while the frames were still held
+    team_of = _team_lookup(player_tracker) if settings['team_pruning'] else None
+
+    with profiler.span('attribute'):
+        last = len(kept) - 1
+        if settings['contact_localization']:
+            return attribute_contacts(event_type, ball_boxes, event_frame - start_frame,
+                                      lambda offset: player_tracker.tracks_at(start_frame + offset), read_jerseys,
+                                      team_of)
+        return attribute_event(event_type, player_tracker.tracks_at(start_frame + last), ball_boxes[last],
+                               lambda tracks: read_jerseys([(track, last) for track in tracks]), team_of)
+
+def attribute_stream(event_type, reader, start_frame, end_frame, event_frame=None, batch_size=16, candidates=4,
+                     detector_pool=None):
+    """Attribute an event while streaming its window through detection and tracking.
+
+    Frames come from reader.iter_window, so only the reader's ring of frame
+    buffers is held, not the whole window. After each batch is detected and
+    tracked, the only pixels kept are crops of the `candidates` tracks nearest
+    the ball in every frame, because attribution can only pick from those. A
+    pick outside them (e.g. on a frame where the ball was never seen) is
+    re-read from the video.
+
+    Args:
+        event_type (str): Event label, e.g. 'pass'
+        reader (VideoFrameReader): Open reader; its ring_size must exceed batch_size
+        start_frame, end_frame (int): Inclusive window bounds
+        event_frame (int): Frame of the event timestamp (defaults to the window middle)
+        batch_size (int): Frames detected per forward pass
+        candidates (int): Tracks nearest the ball whose crops are kept per frame
+        detector_pool (DetectorPool): Decode into shared memory and detect in the
+            pool's worker processes instead (its batch size applies)
+
+    Returns:
+        tuple: (player, receiver) as predict_player_for_event
+    """
+    if event_frame is None:
+        event_frame = (start_frame + end_frame) // 2
+    kept = []
+    if detector_pool is not None:
+        for batch_start, frames, detections in detector_pool.iter_window(reader, start_frame, end_frame):
+            last_ball = next((ball for ball, _ in reversed(kept) if ball is not None), None)
+            kept.extend(track_batch(frames, batch_start, candidates, last_ball, detections))
+        return attribute_kept(event_type, kept, start_frame, event_frame, reader.read)
+    stream = reader.iter_window(start_frame, end_frame)
+    while True:
+        chunk = [item for _, item in zip(range(batch_size), stream)]
+        if not chunk:
+            break
+        last_ball = next((ball for ball, _ in reversed(kept) if ball is not None), None)
+        kept.extend(track_batch([frame for _, frame in chunk], chunk[0][0], candidates, last_ball))
+        if len(chunk) < batch_size:
+            break
+    return attribute_kept(event_type, kept, start_frame, event_frame, reader.read)
+
+def predict_player_for_event(frame, event_type, video_path=None, timestamp=None, fps=20, frames=None, start_frame=None):
+    # If a frame window (or video_path and timestamp) is provided, use tracking over it
+    if frames is None and video_path is not None and timestamp is not None:
+        frames = get_frames_around_event(video_path, timestamp, window=1.0, fps=fps)
+        start_frame = window_bounds(timestamp, fps, 1.0)[0]
+    if frames:
+        window_detections = detect_window(frames, start_frame)
+        event_frame = int(timestamp * fps) if timestamp is not None and start_frame is not None else None
+        return attribute_window(event_type, frames, window_detections, start_frame, event_frame)
     # Fallback: single frame logic
     if frame is None:
-        if event_type.lower() == 'pass':
-            return 'NONE', 'NONE'
-        else:
-            return 'NONE', None
-    player_boxes = player_detector.get_player_boxes(frame)
+        return _no_player(event_type)
+    return attribute_single_frame(event_type, frame, get_player_detector().get_player_boxes(frame))
+
+def attribute_single_frame(event_type, frame, player_boxes):
+    # Fallback when no window could be read: the first detected players of the
+    # event's frame. Only OCR runs here, so the pipeline can detect in its
+    # detect thread and attribute in another.
     if not player_boxes:
-        if event_type.lower() == 'pass':
-            return 'NONE', 'NONE'
-        else:
-            return 'NONE', None
+        return _no_player(event_type)
+    jersey_ocr = get_jersey_ocr()
     bbox = player_boxes[0]
     if jersey_ocr:
         jersey_number = jersey_ocr.recognize_number(frame, bbox)
@@ -105,4 +550,4 @@ def predict_player_for_event(frame, event_type, video_path=None, timestamp=None,
         else:
             return jersey_number, 'NONE'
     else:
-        return jersey_number, None 
\ No newline at end of file
+        return jersey_number, None
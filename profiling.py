@@ -0,0 +1,137 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+# Stages reported per event, in pipeline order, and the counters attached to them
+STAGES = ('model_load', 'decode', 'detect', 'track', 'attribute', 'pose', 'ocr')
+COUNTERS = ('decode_frames', 'detect_frames', 'ocr_crops', 'pose_players')
+STAGE_COLUMNS = tuple(f'{stage}_s' for stage in STAGES) + COUNTERS
+
+class Profiler:
+    def __init__(self):
+        """Collect timed spans per event for stage breakdowns and Chrome traces.
+
+        Disabled by default, in which case span() and event() cost one attribute
+        check. Spans may nest; an event's breakdown uses each span's exclusive
+        time (its duration minus its child spans), so the stages add up to at
+        most the event's wall time. The current event is tracked per thread, so
+        pipeline stages working on different events at once stay separate.
+        """
+        self.enabled = False
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Drop all recorded spans and breakdowns."""
+        with self._lock:
+            self.spans = []
+            self.stages = {}
+        self._origin = time.perf_counter()
+        # Wall-clock anchor, so traces written by different processes line up when merged
+        self._wall_origin = time.time()
+
+    @contextmanager
+    def event(self, event_id):
+        """Attribute spans opened in this thread to event_id until the block exits."""
+        previous = getattr(self._local, 'event', None)
+        self._local.event = event_id
+        try:
+            yield
+        finally:
+            self._local.event = previous
+
+    @contextmanager
+    def span(self, name, **counts):
+        """Time a block as stage `name`.
+        
+        Keyword counts (e.g. detect_frames=16) are summed per event. The block
+        receives the counts dict, so counts only known at the end can be added.
+        """
+        if not self.enabled:
+            yield counts
+            return
+        stack = self._local.__dict__.setdefault('stack', [])
+        frame = [0.0]  # Time spent in child spans
+        stack.append(frame)
+        start = time.perf_counter()
+        try:
+            yield counts
+        finally:
+            duration = time.perf_counter() - start
+            stack.pop()
+            if stack:
+                stack[-1][0] += duration
+            event_id = getattr(self._local, 'event', None)
+            with self._lock:
+                self.spans.append((name, event_id, threading.current_thread(),
+                                   start - self._origin, duration, counts))
+                if event_id is not None:
+                    stages = self.stages.setdefault(event_id, {})
+                    stages[name] = stages.get(name, 0.0) + duration - frame[0]
+                    for counter, value in counts.items():
+                        stages[counter] = stages.get(counter, 0) + value
+
+    def breakdown(self, event_id):
+        """Get one event's stage times (seconds, rounded to ms) and counters, keyed by STAGE_COLUMNS."""
+        stages = self.stages.get(event_id, {})
+        row = {f'{stage}_s': round(stages.get(stage, 0.0), 3) for stage in STAGES}
+        row.update({counter: int(stages.get(counter, 0)) for counter in COUNTERS})
+        return row
+
+    def chrome_trace(self):
+        """Recorded spans as Chrome trace 'complete' events (load in chrome://tracing or Perfetto)."""
+        pid = os.getpid()
+        with self._lock:
+            spans = list(self.spans)
+        threads = {thread.ident: thread.name for _, _, thread, _, _, _ in spans}
+        # Metadata records name the thread rows (decode, detect, MainThread, ...)
+        trace = [{'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': ident, 'args': {'name': name}}
+                 for ident, name in threads.items()]
+        trace.extend(
+            {'name': name, 'cat': 'stage', 'ph': 'X', 'pid': pid, 'tid': thread.ident,
+             'ts': round((self._wall_origin + start) * 1e6, 1), 'dur': round(duration * 1e6, 1),
+             'args': dict(counts, event=None if event_id is None else str(event_id))}
+            for name, event_id, thread, start, duration, counts in spans
+        )
+        return trace
+
+    def write_trace(self, path):
+        with open(path, 'w') as f:
+            json.dump({'traceEvents': self.chrome_trace(), 'displayTimeUnit': 'ms'}, f)
+
+def merge_traces(paths, output_path):
+    """Merge per-process trace files into one, deleting the inputs."""
+    events = []
+    for path in paths:
+        if os.path.exists(path):
+            with open(path) as f:
+                events.extend(json.load(f)['traceEvents'])
+            os.remove(path)
+    with open(output_path, 'w') as f:
+        json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+
+# Process-wide profiler used by all instrumented modules
+profiler = Profiler()
+
+def timed(stage, counter=None, arg=0):
+    """Decorator timing every call of a method as `stage` on the process-wide profiler.
+    
+    Args:
+        stage (str): Stage name, see STAGES
+        counter (str): Counter incremented by len() of one positional argument, see COUNTERS
+        arg (int): Index of that argument, not counting self
+    """
+    def decorate(method):
+        @wraps(method)
+        def wrapper(self, *args, **kwargs):
+            if not profiler.enabled:
+                return method(self, *args, **kwargs)
+            counts = {counter: len(args[arg])} if counter and len(args) > arg else {}
+            with profiler.span(stage, **counts):
+                return method(self, *args, **kwargs)
+        return wrapper
+    return decorate
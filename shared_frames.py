@@ -0,0 +1,250 @@
+import os
+import queue
+import time
+from collections import deque
+import multiprocessing as mp
+from multiprocessing import shared_memory
+import numpy as np
+from profiling import profiler
+
+class SharedFrameRing:
+    def __init__(self, capacity, shape, lock, name=None):
+        """Preallocated frame slots in one shared memory segment, reclaimed by reference counts.
+
+        The segment holds a reference count per slot followed by the frames.
+        Every process that attaches sees the same slots, so a frame decoded by
+        one process is read in another as a plain NumPy view, without copying
+        or pickling. A slot is free while its count is 0; the writer sets the
+        count to the number of readers and each reader releases it once.
+
+        Args:
+            capacity (int): Number of frame slots
+            shape (tuple): (height, width, 3) of every frame
+            lock (multiprocessing.Lock): Guards the reference counts across processes
+            name (str): Segment to attach to; None creates (and later unlinks) a new one
+        """
+        self.capacity = capacity
+        self.shape = tuple(shape)
+        self.lock = lock
+        header = -(-capacity * 4 // 64) * 64  # Reference counts, padded to a cache line
+        self._owner = name is None
+        self.shm = shared_memory.SharedMemory(name=name, create=self._owner,
+                                              size=header + capacity * int(np.prod(self.shape)))
+        self.refcounts = np.ndarray((capacity,), dtype=np.int32, buffer=self.shm.buf)
+        self.frames = np.ndarray((capacity,) + self.shape, dtype=np.uint8, buffer=self.shm.buf, offset=header)
+        if self._owner:
+            self.refcounts[:] = 0
+        self._next = 0
+
+    def spec(self):
+        # What another process needs to attach, besides the lock
+        return self.shm.name, self.capacity, self.shape
+
+    def try_acquire(self, refs):
+        """Claim a free slot for `refs` readers.
+
+        Returns:
+            int: Slot index, or None if every slot is still referenced
+        """
+        with self.lock:
+            for i in range(self.capacity):
+                slot = (self._next + i) % self.capacity
+                if self.refcounts[slot] == 0:
+                    self.refcounts[slot] = refs
+                    self._next = slot + 1
+                    return slot
+        return None
+
+    def release(self, slots, refs=1):
+        """Drop `refs` references to each slot; a slot is reused once its count reaches 0."""
+        with self.lock:
+            for slot in slots:
+                self.refcounts[slot] -= refs
+
+    def close(self):
+        # The views pin the segment's buffer, so they go first
+        self.refcounts = self.frames = None
+        self.shm.close()
+        if self._owner:
+            self.shm.unlink()
+
+def _detector_worker(ring_spec, lock, tasks, results, threads, predictor_options, cache, detect_window=None):
+    # Thread budget before torch is imported, so the workers do not oversubscribe the cores
+    os.environ['OMP_NUM_THREADS'] = str(threads)
+    os.environ['MKL_NUM_THREADS'] = str(threads)
+
+    name, capacity, shape = ring_spec
+    ring = SharedFrameRing(capacity, shape, lock, name=name)
+    detector = None
+    if detect_window is None:
+        from predictor import configure, detect_window, get_player_detector
+        from detection_cache import DetectionCache
+        configure(**predictor_options)
+        detector = get_player_detector()
+        if cache:
+            video_path, cache_dir, shard = cache
+            detector.cache = DetectionCache(video_path, detector.cache_key(), cache_dir=cache_dir, shard=shard)
+    try:
+        while True:
+            task = tasks.get()
+            if task is None:
+                break
+            batch_id, slots, start_frame = task
+            try:
+                result = (batch_id, detect_window([ring.frames[slot] for slot in slots], start_frame), None)
+            except Exception as e:
+                result = (batch_id, None, f'{type(e).__name__}: {e}')
+            # Slots are released before the result is sent, so once the caller has
+            # its result the worker no longer holds any of the batch's slots
+            ring.release(slots)
+            results.put(result)
+    finally:
+        if detector is not None and detector.cache is not None:
+            detector.cache.close()
+        ring.close()
+
+class DetectorPool:
+    def __init__(self, workers, shape, batch_size=16, capacity=None, predictor_options=None,
+                 video_path=None, detection_cache_dir=None, cache_shard='', detect_window=None):
+        """Detector processes fed through a SharedFrameRing, for detection on several cores of one video.
+
+        The calling process decodes frames straight into ring slots and queues
+        only (batch id, slot indices, first frame index); workers return the
+        small per-frame detection arrays. Each slot is referenced by the worker
+        detecting it and by the caller consuming the batch, and is decoded into
+        again once both have released it.
+
+        Args:
+            workers (int): Detector processes, each loading its own model
+            shape (tuple): (height, width, 3) of the video's frames
+            batch_size (int): Frames per detection task
+            capacity (int): Ring slots; the default lets every worker hold one
+                batch and have one queued while the caller holds another
+            predictor_options (dict): Passed to predictor.configure() in every worker
+            video_path (str): Video the frame indices refer to, for the detection cache
+            detection_cache_dir (str): Detection cache directory, or None
+            cache_shard (str): Prefix of the workers' cache shard names
+            detect_window (callable): Module-level function run in the workers as
+                detect_window(frames, start_frame) instead of predictor.detect_window,
+                e.g. a stand-in detector for smoke tests
+        """
+        ctx = mp.get_context('spawn')
+        self.batch_size = batch_size
+        self.ring = SharedFrameRing(capacity or batch_size * (2 * workers + 1), shape, ctx.Lock())
+        self.tasks = ctx.Queue()
+        self.results = ctx.Queue()
+        threads = max(1, (os.cpu_count() or 1) // workers)
+        self.processes = []
+        for i in range(workers):
+            cache = (video_path, detection_cache_dir, f'{cache_shard}d{i}') if video_path and detection_cache_dir else None
+            process = ctx.Process(target=_detector_worker, name=f'detect-{i}', daemon=True,
+                                  args=(self.ring.spec(), self.ring.lock, self.tasks, self.results, threads,
+                                        predictor_options or {}, cache, detect_window))
+            process.start()
+            self.processes.append(process)
+        self._next_batch = 0
+        self._done = {}
+
+    def _submit(self, slots, start_frame):
+        batch_id = self._next_batch
+        self._next_batch += 1
+        self.tasks.put((batch_id, slots, start_frame))
+        return batch_id
+
+    def _result(self, batch_id):
+        # Workers finish out of order; park results until their batch is asked for
+        while batch_id not in self._done:
+            try:
+                done_id, detections, error = self.results.get(timeout=1.0)
+            except queue.Empty:
+                if not all(process.is_alive() for process in self.processes):
+                    raise RuntimeError("A detector worker process exited")
+                continue
+            self._done[done_id] = (detections, error)
+        detections, error = self._done.pop(batch_id)
+        if error:
+            raise RuntimeError(f"Detector worker failed: {error}")
+        return detections
+
+    def _wait_for_slot(self, timeout=30.0):
+        # Every slot is held although none of this window's batches are pending:
+        # they are still being released elsewhere, so wait rather than end the window
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            slot = self.ring.try_acquire(2)
+            if slot is not None:
+                return slot
+            if not all(process.is_alive() for process in self.processes):
+                raise RuntimeError("A detector worker process exited")
+            time.sleep(0.005)
+        raise RuntimeError(f"No free frame slot in the shared ring after {timeout}s")
+
+    def iter_window(self, reader, start, end):
+        """Decode and detect the inclusive frame range [start, end] across the workers.
+
+        Frames are decoded ahead into free slots while the workers detect
+        earlier batches. Each yielded frame list holds views into the ring that
+        are reused as soon as the caller asks for the next batch.
+
+        Yields:
+            tuple: (first frame index, frames, per-frame detections) per batch, in
+                frame order, stopping at the first frame that fails to read
+        """
+        in_flight = deque()  # (batch id, first frame, slots) in frame order
+        batch, batch_start = [], start
+        frame_idx = start
+        exhausted = False
+        try:
+            while True:
+                while not exhausted:
+                    if frame_idx > end:
+                        exhausted = True
+                        break
+                    # One reference for the worker, one for the caller
+                    slot = self.ring.try_acquire(2)
+                    if slot is None:
+                        if batch or in_flight:
+                            # Consuming a batch frees slots
+                            break
+                        slot = self._wait_for_slot()
+                    if not reader.read_into(frame_idx, self.ring.frames[slot]):
+                        self.ring.release([slot], refs=2)
+                        exhausted = True
+                        break
+                    batch.append(slot)
+                    frame_idx += 1
+                    if len(batch) == self.batch_size:
+                        in_flight.append((self._submit(batch, batch_start), batch_start, batch))
+                        batch, batch_start = [], frame_idx
+                if batch and (exhausted or not in_flight):
+                    in_flight.append((self._submit(batch, batch_start), batch_start, batch))
+                    batch, batch_start = [], frame_idx
+                if not in_flight:
+                    break
+                batch_id, first, slots = in_flight.popleft()
+                with profiler.span('detect', detect_frames=len(slots)):
+                    detections = self._result(batch_id)
+                try:
+                    yield first, [self.ring.frames[slot] for slot in slots], detections
+                finally:
+                    self.ring.release(slots)
+        finally:
+            # Abandoned early: wait out the batches still with the workers and free their slots
+            for batch_id, _, slots in in_flight:
+                try:
+                    self._result(batch_id)
+                except RuntimeError:
+                    pass
+                self.ring.release(slots)
+            if batch:
+                self.ring.release(batch, refs=2)
+
+    def close(self):
+        """Stop the workers and free the shared segment."""
+        for _ in self.processes:
+            self.tasks.put(None)
+        for process in self.processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        self.ring.close()
@@ -0,0 +1,139 @@
+import argparse
+import cv2
+import numpy as np
+import pandas as pd
+
+TEAM_COLORS = ((40, 40, 200), (200, 120, 30))  # BGR: red and blue shirts
+
+def simulate_match(seconds=30, fps=20, size=(1280, 720), players=22, pass_every=2.0, travel=0.6, seed=0):
+    """Simulate player movement and a scripted ball path, without rendering.
+
+    Players drift around the pitch on smooth random walks. The ball is held by
+    one player, kicked to a team-mate pass_every seconds later, travels to
+    them in a straight line over `travel` seconds and is held again.
+
+    Args:
+        seconds (float): Clip length
+        fps (int): Frame rate
+        size (tuple): Frame (width, height)
+        players (int): Number of players, split evenly between two teams
+        pass_every (float): Seconds between kicks
+        travel (float): Seconds the ball is in flight
+        seed (int): Random seed; the same arguments always give the same match
+
+    Returns:
+        dict: player_boxes (T, P, 4), ball_boxes (T, 4), numbers (P,) jersey
+            numbers, teams (P,) 0/1, and passes as (kick frame, passer, receiver)
+    """
+    rng = np.random.default_rng(seed)
+    width, height = size
+    teams = np.arange(players) % 2
+    frames = int(seconds * fps)
+    box_w, box_h = max(8, int(height * 0.035)), max(20, int(height * 0.085))
+    margin = np.array([box_w, box_h], dtype=np.float32)
+    upper = np.array([width, height], dtype=np.float32) - margin
+
+    position = rng.uniform(margin, upper, size=(players, 2)).astype(np.float32)
+    velocity = np.zeros((players, 2), dtype=np.float32)
+    centers = np.empty((frames, players, 2), dtype=np.float32)
+    for t in range(frames):
+        # Smooth random walk: velocity drifts, position bounces off the edges
+        velocity = 0.9 * velocity + rng.normal(0, 0.6, size=(players, 2)).astype(np.float32)
+        position += velocity
+        low, high = position < margin, position > upper
+        velocity[low | high] *= -1
+        position = np.clip(position, margin, upper)
+        centers[t] = position
+    half = np.array([box_w / 2, box_h / 2], dtype=np.float32)
+    player_boxes = np.concatenate([centers - half, centers + half], axis=2)
+
+    # Ball at the holder's feet, or in flight between passer and receiver
+    feet = np.stack([centers[..., 0], centers[..., 1] + box_h / 2], axis=2)
+    ball_r = max(3, box_w // 3)
+    ball = np.empty((frames, 2), dtype=np.float32)
+    passes = []
+    holder, t = 0, 0
+    hold_frames, travel_frames = max(1, int((pass_every - travel) * fps)), max(1, int(travel * fps))
+    while t < frames:
+        hold_end = min(frames, t + hold_frames)
+        ball[t:hold_end] = feet[t:hold_end, holder]
+        t = hold_end
+        if t >= frames:
+            break
+        # Passes go to a team-mate, so the scripted receiver is a real reception
+        mates = [p for p in range(players) if p != holder and teams[p] == teams[holder]]
+        receiver = int(rng.choice(mates or [p for p in range(players) if p != holder]))
+        passes.append((t, holder, receiver))
+        land = min(frames - 1, t + travel_frames)
+        steps = np.linspace(0, 1, land - t + 1, dtype=np.float32)[:, None]
+        ball[t:land + 1] = feet[t, holder] * (1 - steps) + feet[land, receiver] * steps
+        holder, t = receiver, land + 1
+    ball_boxes = np.concatenate([ball - ball_r, ball + ball_r], axis=1)
+
+    numbers = rng.permutation(np.arange(1, 100))[:players]
+    return {'player_boxes': player_boxes, 'ball_boxes': ball_boxes, 'numbers': numbers,
+            'teams': teams, 'passes': passes, 'fps': fps, 'size': size}
+
+def render_match(match, video_path, seed=0):
+    """Render a simulated match to an mp4 file.
+
+    Each frame is a textured green pitch with white lines, players drawn as
+    shirt-coloured boxes with their number on the torso, and a white ball.
+    """
+    rng = np.random.default_rng(seed)
+    width, height = match['size']
+    writer = cv2.VideoWriter(video_path, cv2.VideoWriter_fourcc(*'mp4v'), match['fps'], (width, height))
+    # Static grass texture so compression and optical flow behave like real footage
+    pitch = np.empty((height, width, 3), dtype=np.uint8)
+    pitch[:] = (40, 140, 50)
+    noise = rng.integers(-12, 12, size=(height, width, 1), dtype=np.int16)
+    pitch = np.clip(pitch.astype(np.int16) + noise, 0, 255).astype(np.uint8)
+    for x in np.linspace(0, width, 11)[1:-1].astype(int):
+        cv2.rectangle(pitch, (x - 30, 0), (x + 30, height), (45, 155, 55), -1)  # Mowing stripes
+    cv2.rectangle(pitch, (20, 20), (width - 20, height - 20), (235, 235, 235), 2)
+    cv2.line(pitch, (width // 2, 20), (width // 2, height - 20), (235, 235, 235), 2)
+    cv2.circle(pitch, (width // 2, height // 2), height // 6, (235, 235, 235), 2)
+
+    for boxes, ball in zip(match['player_boxes'], match['ball_boxes']):
+        frame = pitch.copy()
+        for (x1, y1, x2, y2), number, team in zip(boxes.astype(int), match['numbers'], match['teams']):
+            torso = y1 + (y2 - y1) // 2
+            cv2.rectangle(frame, (x1, y1), (x2, torso), TEAM_COLORS[team], -1)
+            cv2.rectangle(frame, (x1, torso), (x2, y2), (30, 30, 30), -1)  # Shorts and legs
+            cv2.putText(frame, str(number), (x1, y1 + (torso - y1) * 3 // 4), cv2.FONT_HERSHEY_SIMPLEX,
+                        (x2 - x1) / 40, (255, 255, 255), 1, cv2.LINE_AA)
+        x1, y1, x2, y2 = ball.astype(int)
+        cv2.circle(frame, ((x1 + x2) // 2, (y1 + y2) // 2), max(2, (x2 - x1) // 2), (250, 250, 250), -1)
+        writer.write(frame)
+    writer.release()
+
+def write_events(match, eval_csv, truth_csv=None):
+    """Write the scripted passes as an eval.csv, and optionally the ground truth.
+
+    eval.csv has the repo's timestamp,event columns; the truth file adds the
+    passer's and receiver's jersey numbers for accuracy checks.
+    """
+    fps, numbers = match['fps'], match['numbers']
+    rows = [(round(kick / fps, 2), 'pass', str(numbers[passer]), str(numbers[receiver]))
+            for kick, passer, receiver in match['passes']]
+    events = pd.DataFrame(rows, columns=['timestamp', 'event', 'player', 'receiver'])
+    events[['timestamp', 'event']].to_csv(eval_csv, index=False)
+    if truth_csv:
+        events.to_csv(truth_csv, index=False)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic match clip with a matching eval.csv")
+    parser.add_argument("--video", default="synthetic_match.mp4")
+    parser.add_argument("--events", default="synthetic_eval.csv")
+    parser.add_argument("--truth", default="synthetic_truth.csv")
+    parser.add_argument("--seconds", type=float, default=30)
+    parser.add_argument("--fps", type=int, default=20)
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--players", type=int, default=22)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    match = simulate_match(args.seconds, args.fps, (args.width, args.height), args.players, seed=args.seed)
+    render_match(match, args.video, seed=args.seed)
+    write_events(match, args.events, args.truth)
+    print(f"Synthetic match written to {args.video} ({len(match['passes'])} passes in {args.events})")
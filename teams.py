@@ -0,0 +1,115 @@
+import cv2
+import numpy as np
+
+def shirt_features(frame, bbox, bins=(8, 3, 3)):
+    """Colour feature of a player's shirt: a hue/saturation/value histogram of the torso.
+
+    The torso is taken as the central part of the upper half of the box, so
+    the head, shorts and most of the background are left out. Grass pixels
+    are masked, since they would pull every player towards the same colour.
+
+    Args:
+        frame (np.ndarray): Frame (or crop) in BGR format
+        bbox (list): Player box [x1, y1, x2, y2] in frame coordinates
+        bins (tuple): Histogram bins for hue, saturation and value
+
+    Returns:
+        np.ndarray: Square root of the normalised histogram, so the euclidean
+            distance between two features approximates the Hellinger distance
+            between the histograms; None if too few shirt pixels are visible
+    """
+    x1, y1, x2, y2 = bbox
+    width, height = x2 - x1, y2 - y1
+    frame_h, frame_w = frame.shape[:2]
+    top, bottom = max(0, int(y1 + 0.15 * height)), min(frame_h, int(y1 + 0.5 * height))
+    left, right = max(0, int(x1 + 0.2 * width)), min(frame_w, int(x2 - 0.2 * width))
+    if bottom - top < 2 or right - left < 2:
+        return None
+    hsv = cv2.cvtColor(frame[top:bottom, left:right], cv2.COLOR_BGR2HSV)
+    grass = cv2.inRange(hsv, (35, 60, 40), (85, 255, 255))
+    hist = cv2.calcHist([hsv], [0, 1, 2], cv2.bitwise_not(grass), list(bins), [0, 180, 0, 256, 0, 256]).ravel()
+    total = hist.sum()
+    if total < 8:
+        return None
+    return np.sqrt(hist / total)
+
+class TeamClassifier:
+    def __init__(self, max_clusters=5, new_cluster_distance=0.5, min_tracks=6, min_samples=3, max_samples=10,
+                 iterations=3):
+        """Group tracks into teams and others (referees, goalkeepers) by shirt colour, as the match goes on.
+
+        A track is described by the mean shirt feature of its crops. Once a
+        track has max_samples crops, older ones fade out, so an id that moves
+        to another player soon takes on that player's colour. Tracks are
+        grouped again whenever their features have changed. Leader clustering
+        in the order tracks were first seen gives the clusters, and a few
+        k-means passes then settle their centres. The two clusters with the
+        most tracks are the teams and every other cluster is 'other'.
+
+        Args:
+            max_clusters (int): Clusters kept; beyond this tracks join the nearest one
+            new_cluster_distance (float): Feature distance above which a track starts a new cluster
+            min_tracks (int): Described tracks needed before any team is reported
+            min_samples (int): Crops a track needs before it is described
+            max_samples (int): Crops averaged per track; later crops replace the oldest gradually
+            iterations (int): k-means passes after leader clustering
+        """
+        self.max_clusters = max_clusters
+        self.new_cluster_distance = new_cluster_distance
+        self.min_tracks = min_tracks
+        self.min_samples = min_samples
+        self.max_samples = max_samples
+        self.iterations = iterations
+        # track key -> [mean feature, crops seen, frame of the last crop]
+        self._tracks = {}
+        self._clusters = None
+
+    def add(self, track_key, feature, frame_idx=None):
+        """Add a crop's shirt feature (see shirt_features) to a track's description.
+
+        A frame_idx no later than the track's last crop is ignored, so frames
+        shared by overlapping event windows are only counted once.
+        """
+        if feature is None:
+            return
+        entry = self._tracks.get(track_key)
+        if entry is None:
+            self._tracks[track_key] = [feature.copy(), 1, frame_idx]
+        else:
+            if frame_idx is not None and entry[2] is not None and frame_idx <= entry[2]:
+                return
+            entry[1] += 1
+            entry[0] += (feature - entry[0]) / min(entry[1], self.max_samples)
+            entry[2] = frame_idx
+        self._clusters = None
+
+    def _cluster(self):
+        keys = [key for key, entry in self._tracks.items() if entry[1] >= self.min_samples]
+        if len(keys) < self.min_tracks:
+            return {}
+        features = np.array([self._tracks[key][0] for key in keys])
+        centroids = []
+        for feature in features:
+            if not centroids or (len(centroids) < self.max_clusters and
+                                 np.linalg.norm(np.array(centroids) - feature, axis=1).min() > self.new_cluster_distance):
+                centroids.append(feature)
+        centroids = np.array(centroids)
+        for _ in range(self.iterations + 1):
+            distances = np.linalg.norm(features[:, None, :] - centroids[None, :, :], axis=2)
+            labels = distances.argmin(axis=1)
+            centroids = np.array([features[labels == i].mean(axis=0) if (labels == i).any() else centroids[i]
+                                  for i in range(len(centroids))])
+        sizes = np.bincount(labels, minlength=len(centroids))
+        # Labels follow cluster creation order, so the two teams do not swap as the counts change
+        teams = sorted(np.argsort(-sizes, kind='stable')[:2].tolist())
+        return {key: teams.index(label) if label in teams else -1 for key, label in zip(keys, labels.tolist())}
+
+    def team(self, track_key):
+        """Get a track's team: 0 or 1, -1 for 'other', or None while it is unknown."""
+        if self._clusters is None:
+            self._clusters = self._cluster()
+        return self._clusters.get(track_key)
+
+    def clear(self):
+        self._tracks.clear()
+        self._clusters = None
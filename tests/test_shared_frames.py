@@ -0,0 +1,62 @@
+import functools
+import os
+import sys
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import event_processor
+import predictor
+from shared_frames import DetectorPool
+from synthetic_match import simulate_match, render_match
+from video_utils import VideoFrameReader
+
+def stub_detect_window(frames, start_frame):
+    # Stand-in detector run in the pool's workers: one player and a ball per
+    # frame, with the frame's mean intensity as the player's confidence so the
+    # test can check each result came from the right frame's pixels
+    detections = []
+    for offset, frame in enumerate(frames):
+        x = 40.0 + 2 * (start_frame + offset)
+        detections.append(np.array([[x, 40, x + 20, 90, frame.mean() / 255, 0],
+                                    [x + 25, 85, x + 31, 91, 0.8, 32]], dtype=np.float32))
+    return detections
+
+@pytest.fixture(scope='module')
+def video(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp('pool') / 'match.mp4')
+    render_match(simulate_match(seconds=3, fps=20, size=(320, 240), players=4), path)
+    return path
+
+def test_iter_window_covers_the_window_in_order(video):
+    reader = VideoFrameReader(video, keyframe_index_dir=None)
+    expected = reader.read_window(5, 44)
+    pool = DetectorPool(2, reader.frame_shape(), batch_size=8, capacity=12, detect_window=stub_detect_window)
+    try:
+        seen = []
+        for first, frames, detections in pool.iter_window(reader, 5, 44):
+            for offset, (frame, dets) in enumerate(zip(frames, detections)):
+                assert np.array_equal(frame, expected[len(seen)])
+                assert dets[0, 4] == pytest.approx(frame.mean() / 255)
+                seen.append(first + offset)
+        assert seen == list(range(5, 45))
+        # Abandoning a window early must still free every slot
+        for _ in pool.iter_window(reader, 0, 40):
+            break
+        assert not pool.ring.refcounts.any()
+    finally:
+        pool.close()
+        reader.release()
+
+def test_process_events_with_detect_workers(video, tmp_path, monkeypatch):
+    monkeypatch.setattr(event_processor, 'DetectorPool',
+                        functools.partial(DetectorPool, detect_window=stub_detect_window))
+    events_csv, output = str(tmp_path / 'events.csv'), str(tmp_path / 'out.csv')
+    pd.DataFrame({'timestamp': [1.0, 2.0], 'event': ['pass', 'shot']}).to_csv(events_csv, index=False)
+    event_processor.process_events(events_csv, video, output, detection_cache_dir=None, detect_workers=2)
+    result = pd.read_csv(output)
+    assert list(result['event']) == ['pass', 'shot']
+    # The main process leaves detection to the pool and never loads a detector of its own
+    assert predictor._player_detector is None
@@ -0,0 +1,38 @@
+import os
+import sys
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import predictor
+from teams import TeamClassifier
+
+RED, BLUE, NOISE = np.eye(3)
+
+def test_first_crop_is_outvoted_by_later_ones():
+    teams = TeamClassifier(min_tracks=4, min_samples=3)
+    for track in range(4):
+        colour = RED if track % 2 == 0 else BLUE
+        # Track 0's first crop shows the other team's shirt (e.g. an occluding player)
+        crops = [BLUE, RED, RED, RED] if track == 0 else [colour] * 4
+        for frame_idx, crop in enumerate(crops):
+            teams.add(track, crop + 0.05 * NOISE, frame_idx)
+    assert teams.team(0) == teams.team(2) != teams.team(1) == teams.team(3)
+    # Frames already counted (overlapping windows) are not added again
+    for _ in range(5):
+        teams.add(0, BLUE, 3)
+    assert teams.team(0) == teams.team(2)
+
+def test_opponent_gives_way_only_to_a_nearby_team_mate():
+    ball = [100, 100, 104, 104]
+    opponent = {'id': 1, 'bbox': [100, 110, 104, 114]}  # 10px from the ball
+    near_mate = {'id': 2, 'bbox': [100, 116, 104, 120]}  # 16px
+    far_mate = {'id': 3, 'bbox': [100, 160, 104, 164]}  # 60px
+    team_of = {1: 1, 2: 0, 3: 0}.get
+    pick = predictor._prefer_team([opponent, near_mate], ball, 0, lambda track: team_of(track['id']))
+    assert pick == [near_mate]
+    # Too far to outweigh the opponent at the ball: the nearest candidate stays
+    pick = predictor._prefer_team([opponent, far_mate], ball, 0, lambda track: team_of(track['id']))
+    assert pick == [opponent]
+    # Unknown passer team: plain nearest candidate
+    assert predictor._prefer_team([far_mate, opponent], ball, None, lambda track: team_of(track['id'])) == [opponent]
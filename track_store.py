@@ -0,0 +1,168 @@
+import os
+import json
+from collections import Counter
+import numpy as np
+
+class TrackStore:
+    def __init__(self, fps, frame_count, track_frames, track_ids, track_boxes, track_conf,
+                 ball_frames, ball_boxes, ball_conf, jersey_track_ids, jersey_frames, jersey_numbers):
+        """Precomputed per-frame player tracks, ball positions and jersey reads for a match.
+
+        Track and ball rows are sorted by frame, so a frame or timestamp range is
+        two binary searches away. Track rows are also indexed by (track id, frame)
+        for per-track history queries. Build one with `precompute.py`.
+
+        Args:
+            fps (float): Frame rate of the source video
+            frame_count (int): Number of frames processed
+            track_frames, track_ids (np.ndarray): Frame index and track id per track row
+            track_boxes (np.ndarray): (M, 4) track boxes [x1, y1, x2, y2]
+            track_conf (np.ndarray): Confidence per track row
+            ball_frames (np.ndarray): Frame index per ball row
+            ball_boxes (np.ndarray): (B, 4) ball boxes
+            ball_conf (np.ndarray): Confidence per ball row
+            jersey_track_ids, jersey_frames (np.ndarray): Track id and frame of each jersey read
+            jersey_numbers (np.ndarray): Recognized jersey number strings
+        """
+        self.fps = float(fps)
+        self.frame_count = int(frame_count)
+        self.track_frames = track_frames
+        self.track_ids = track_ids
+        self.track_boxes = track_boxes
+        self.track_conf = track_conf
+        self.ball_frames = ball_frames
+        self.ball_boxes = ball_boxes
+        self.ball_conf = ball_conf
+        self.jersey_track_ids = jersey_track_ids
+        self.jersey_frames = jersey_frames
+        self.jersey_numbers = jersey_numbers
+        # Secondary index: track rows ordered by (track id, frame)
+        self.track_order = np.lexsort((track_frames, track_ids))
+        self._ids_by_track = np.asarray(track_ids)[self.track_order]
+        self._jersey_votes = None
+
+    def frame_range(self, start, end):
+        """Row slice of the track table covering frames [start, end]."""
+        lo = np.searchsorted(self.track_frames, start, side='left')
+        hi = np.searchsorted(self.track_frames, end, side='right')
+        return slice(lo, hi)
+
+    def timestamp_range(self, start_time, end_time):
+        """Row slice of the track table covering a timestamp range in seconds."""
+        return self.frame_range(int(start_time * self.fps), int(end_time * self.fps))
+
+    def tracks_at(self, frame_idx):
+        """Get the tracked players in a frame.
+
+        Returns:
+            list: Tracked players, each containing bbox, id and confidence
+        """
+        rows = self.frame_range(frame_idx, frame_idx)
+        return [
+            {'bbox': box.tolist(), 'id': int(track_id), 'confidence': float(conf)}
+            for box, track_id, conf in zip(self.track_boxes[rows], self.track_ids[rows], self.track_conf[rows])
+        ]
+
+    def ball_at(self, frame_idx):
+        """Get the ball box in a frame, or None if the ball was not detected."""
+        i = np.searchsorted(self.ball_frames, frame_idx, side='left')
+        if i < len(self.ball_frames) and self.ball_frames[i] == frame_idx:
+            return self.ball_boxes[i].tolist()
+        return None
+
+    def track_history(self, track_id):
+        """Get the frames and boxes of one track, in frame order.
+
+        Returns:
+            tuple: (frame indices, (K, 4) boxes)
+        """
+        lo = np.searchsorted(self._ids_by_track, track_id, side='left')
+        hi = np.searchsorted(self._ids_by_track, track_id, side='right')
+        rows = self.track_order[lo:hi]
+        return self.track_frames[rows], self.track_boxes[rows]
+
+    def jersey_for_track(self, track_id):
+        """Get the most frequently read jersey number for a track, or 'NONE'."""
+        if self._jersey_votes is None:
+            votes = {}
+            for track, number in zip(self.jersey_track_ids.tolist(), self.jersey_numbers.tolist()):
+                if number != 'NONE':
+                    votes.setdefault(track, Counter())[number] += 1
+            self._jersey_votes = {track: counts.most_common(1)[0][0] for track, counts in votes.items()}
+        return self._jersey_votes.get(int(track_id), 'NONE')
+
+    def save(self, path):
+        """Write the store as a directory of .npy columns plus metadata."""
+        os.makedirs(path, exist_ok=True)
+        for name in ('track_frames', 'track_ids', 'track_boxes', 'track_conf',
+                     'ball_frames', 'ball_boxes', 'ball_conf',
+                     'jersey_track_ids', 'jersey_frames', 'jersey_numbers'):
+            np.save(os.path.join(path, f'{name}.npy'), getattr(self, name))
+        with open(os.path.join(path, 'meta.json'), 'w') as f:
+            json.dump({'fps': self.fps, 'frame_count': self.frame_count}, f)
+
+    @classmethod
+    def load(cls, path):
+        """Open a store written by save(); columns are memory-mapped, not read up front."""
+        with open(os.path.join(path, 'meta.json')) as f:
+            meta = json.load(f)
+
+        def column(name):
+            return np.load(os.path.join(path, f'{name}.npy'), mmap_mode='r')
+
+        return cls(
+            meta['fps'], meta['frame_count'],
+            column('track_frames'), column('track_ids'), column('track_boxes'), column('track_conf'),
+            column('ball_frames'), column('ball_boxes'), column('ball_conf'),
+            column('jersey_track_ids'), column('jersey_frames'), np.load(os.path.join(path, 'jersey_numbers.npy'))
+        )
+
+class TrackStoreWriter:
+    def __init__(self, fps):
+        """Accumulate per-frame results in frame order and build a TrackStore.
+
+        Args:
+            fps (float): Frame rate of the source video
+        """
+        self.fps = fps
+        self.frame_count = 0
+        self._tracks = []
+        self._balls = []
+        self._jerseys = []
+
+    def add_frame(self, frame_idx, tracks, ball_box, ball_conf=0.0):
+        """Record the tracked players and ball of one frame.
+
+        Args:
+            frame_idx (int): Frame index (must not decrease between calls)
+            tracks (list): Tracked players from PlayerTracker.update
+            ball_box (list): Ball box [x1, y1, x2, y2] or None
+            ball_conf (float): Ball detection confidence
+        """
+        if tracks:
+            # One small array per frame keeps memory far below a list of per-row tuples
+            self._tracks.append(np.array(
+                [(frame_idx, track['id'], *track['bbox'], track['confidence']) for track in tracks],
+                dtype=np.float64))
+        if ball_box is not None:
+            self._balls.append(np.array([(frame_idx, *ball_box, ball_conf)], dtype=np.float64))
+        self.frame_count = max(self.frame_count, frame_idx + 1)
+
+    def add_jersey(self, frame_idx, track_id, number):
+        self._jerseys.append((track_id, frame_idx, number))
+
+    def build(self):
+        tracks = np.concatenate(self._tracks) if self._tracks else np.empty((0, 7))
+        balls = np.concatenate(self._balls) if self._balls else np.empty((0, 6))
+        # Stable sort keeps per-frame insertion order
+        tracks = tracks[np.argsort(tracks[:, 0], kind='stable')]
+        balls = balls[np.argsort(balls[:, 0], kind='stable')]
+        return TrackStore(
+            self.fps, self.frame_count,
+            tracks[:, 0].astype(np.int32), tracks[:, 1].astype(np.int32),
+            tracks[:, 2:6].astype(np.float32), tracks[:, 6].astype(np.float32),
+            balls[:, 0].astype(np.int32), balls[:, 1:5].astype(np.float32), balls[:, 5].astype(np.float32),
+            np.array([j[0] for j in self._jerseys], dtype=np.int32),
+            np.array([j[1] for j in self._jerseys], dtype=np.int32),
+            np.array([j[2] for j in self._jerseys], dtype=str)
+        )
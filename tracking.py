@@ -1,28 +1,78 @@
-from norfair import Detection, Tracker
+from collections import OrderedDict
 import numpy as np
+from profiling import timed
+from byte_tracker import ByteTracker
+
+BACKENDS = ('norfair', 'bytetrack')
 
 class PlayerTracker:
-    def __init__(self, distance_threshold=30):
-        """Initialize the Norfair tracker for player tracking.
+    def __init__(self, distance_threshold=30, max_gap=50, history_frames=500, backend='norfair'):
+        """Initialize the tracker for player tracking.
+        
+        The tracker is fed one frame at a time and keeps its state between calls,
+        so consecutive event windows continue the same tracks instead of starting over.
         
         Args:
-            distance_threshold (float): Maximum distance between detections to be considered the same player
+            distance_threshold (float): Maximum distance between detections to be considered the same player (norfair)
+            max_gap (int): Largest jump in frame index that still continues existing tracks
+            history_frames (int): Number of most recent frames whose tracks are kept for history queries
+            backend (str): 'norfair' matches box centres and reports a fixed 20px box per
+                track; 'bytetrack' (see byte_tracker.py) matches whole boxes by IoU,
+                also uses low-confidence detections, and reports the tracked boxes
         """
-        self.tracker = Tracker(
-            distance_function="euclidean",
-            distance_threshold=distance_threshold,
-            hit_counter_max=30,  # Keep tracks alive for longer
-            initialization_delay=1  # Start tracking immediately
-        )
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown tracker backend {backend!r}; expected one of {BACKENDS}")
+        self.backend = backend
+        self.distance_threshold = distance_threshold
+        self.max_gap = max_gap
+        self.history_frames = history_frames
+        # Bumped on every reset; track ids are only unique within one generation
+        self.generation = -1
+        self.reset()
+        
+    def reset(self):
+        """Drop all tracks and history, e.g. before jumping to a distant part of the video."""
+        self._new_tracker()
+        self.last_frame = None
+        self.frame_tracks = OrderedDict()
+        self.generation += 1
+        # Added to the underlying tracker's ids, which restart at every cut
+        self._id_base = 0
+        self._max_id = 0
         
-    def update(self, detections):
-        """Update tracks with new detections.
+    def cut(self):
+        """Start fresh tracks at a scene cut, keeping the history of earlier frames.
+        
+        Ids after the cut continue above every id before it, so a track on
+        one side of the cut is never taken for a player on the other side.
+        """
+        self._new_tracker()
+        self._id_base = self._max_id
+        
+    def _new_tracker(self):
+        if self.backend == 'bytetrack':
+            # Tracks survive as long as Norfair's hit counter allows
+            self.tracker = ByteTracker(max_lost=30)
+        else:
+            from norfair import Tracker
+            
+            self.tracker = Tracker(
+                distance_function="euclidean",
+                distance_threshold=self.distance_threshold,
+                hit_counter_max=30,  # Keep tracks alive for longer
+                initialization_delay=1  # Start tracking immediately
+            )
+        
+    def update(self, detections, frame_idx=None):
+        """Update tracks with the detections of the next frame.
         
         Args:
             detections (list): List of detections, each containing:
                 - bbox: [x1, y1, x2, y2]
                 - confidence: float
                 - class: int
+            frame_idx (int): Index of the frame the detections belong to
+                (defaults to the frame after the previous update)
                 
         Returns:
             list: List of tracked objects, each containing:
@@ -30,6 +80,34 @@ class PlayerTracker:
                 - id: int (track ID)
                 - confidence: float
         """
+        if frame_idx is None:
+            frame_idx = 0 if self.last_frame is None else self.last_frame + 1
+        if self.backend == 'bytetrack':
+            tracks = self._update_bytetrack(detections, frame_idx)
+        else:
+            tracks = self._update_norfair(detections)
+        for track in tracks:
+            track['id'] += self._id_base
+            self._max_id = max(self._max_id, track['id'])
+        self.last_frame = frame_idx
+        self.frame_tracks[frame_idx] = tracks
+        while len(self.frame_tracks) > self.history_frames:
+            self.frame_tracks.popitem(last=False)
+            
+        return tracks
+    
+    def _update_bytetrack(self, detections, frame_idx):
+        players = [det for det in detections if det['class'] == 0]
+        # Frames skipped since the last update are bridged by the Kalman prediction
+        steps = 1 if self.last_frame is None else max(1, frame_idx - self.last_frame)
+        boxes, ids, scores = self.tracker.update([det['bbox'] for det in players],
+                                                 [det['confidence'] for det in players], steps)
+        return [{'bbox': box, 'id': int(track_id), 'confidence': float(score)}
+                for box, track_id, score in zip(boxes.tolist(), ids, scores)]
+    
+    def _update_norfair(self, detections):
+        from norfair import Detection
+        
         # Convert detections to Norfair format
         norfair_detections = []
         for det in detections:
@@ -59,9 +137,73 @@ class PlayerTracker:
                 'id': obj.id,
                 'confidence': obj.last_detection.scores[0] if obj.last_detection else 0.0
             })
-            
         return tracks
     
+    @timed('track')
+    def update_sequence(self, frame_detections, start_frame, cuts=()):
+        """Feed a time-ordered stream of per-frame detections.
+        
+        Frames already seen by an earlier call (overlapping event windows) are
+        skipped; a window that starts before the kept history or after a gap
+        larger than max_gap starts fresh tracks, and so does every scene cut.
+        
+        Args:
+            frame_detections (list): One list of detections (see update) per frame
+            start_frame (int): Frame index of the first entry
+            cuts (list): Offsets of entries that start a new shot (see cut)
+            
+        Returns:
+            list: Tracked players in the last frame of the sequence
+        """
+        if self.last_frame is not None:
+            oldest = next(iter(self.frame_tracks), self.last_frame)
+            if start_frame < oldest or start_frame > self.last_frame + self.max_gap:
+                self.reset()
+        for offset, detections in enumerate(frame_detections):
+            frame_idx = start_frame + offset
+            if self.last_frame is not None and frame_idx <= self.last_frame:
+                continue
+            if offset in cuts and self.last_frame is not None:
+                self.cut()
+            self.update(detections, frame_idx)
+        return self.tracks_at(start_frame + len(frame_detections) - 1)
+    
+    def tracks_at(self, frame_idx):
+        """Get the tracked players in a frame from the kept history.
+        
+        Returns:
+            list: Tracked players (see update), empty if the frame is not in history
+        """
+        return self.frame_tracks.get(frame_idx, [])
+    
+    def position(self, track_id, frame_idx):
+        """Get the bounding box of a track in a given frame.
+        
+        Args:
+            track_id (int): Track ID
+            frame_idx (int): Frame index
+            
+        Returns:
+            list: Bounding box [x1, y1, x2, y2] or None if the track was not seen in that frame
+        """
+        for track in self.tracks_at(frame_idx):
+            if track['id'] == track_id:
+                return track['bbox']
+        return None
+    
+    def track_history(self, track_id):
+        """Get the kept history of one track.
+        
+        Returns:
+            list: (frame_idx, bbox) pairs in frame order
+        """
+        return [
+            (frame_idx, track['bbox'])
+            for frame_idx, tracks in self.frame_tracks.items()
+            for track in tracks
+            if track['id'] == track_id
+        ]
+    
     def get_tracked_players(self, frame, player_boxes):
         """Get tracked players from player bounding boxes.
         
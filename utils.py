@@ -1,6 +1,8 @@
 import cv2
 import numpy as np
 from typing import List, Dict, Tuple, Optional
+from association import pairwise_iou
+from video_utils import get_video_reader
 
 def calculate_iou(box1: List[float], box2: List[float]) -> float:
     """Calculate Intersection over Union between two bounding boxes.
@@ -12,21 +14,7 @@ def calculate_iou(box1: List[float], box2: List[float]) -> float:
     Returns:
         float: IoU score
     """
-    # Get coordinates of intersection rectangle
-    x1 = max(box1[0], box2[0])
-    y1 = max(box1[1], box2[1])
-    x2 = min(box1[2], box2[2])
-    y2 = min(box1[3], box2[3])
-    
-    # Calculate intersection area
-    intersection = max(0, x2 - x1) * max(0, y2 - y1)
-    
-    # Calculate union area
-    box1_area = (box1[2] - box1[0]) * (box1[3] - box1[1])
-    box2_area = (box2[2] - box2[0]) * (box2[3] - box2[1])
-    union = box1_area + box2_area - intersection
-    
-    return intersection / union if union > 0 else 0
+    return float(pairwise_iou([box1], [box2])[0, 0])
 
 def associate_players_with_ball(
     player_tracks: List[Dict],
@@ -46,21 +34,17 @@ def associate_players_with_ball(
     if not ball_box or not player_tracks:
         return None, None
         
-    # Calculate IoU between ball and each player
-    ious = [calculate_iou(track['bbox'], ball_box) for track in player_tracks]
+    # IoU between the ball and every player in one vectorized call
+    ious = pairwise_iou([track['bbox'] for track in player_tracks], [ball_box])[:, 0]
     
-    # Get players with IoU above threshold
-    associated_players = [
-        (i, track['id']) for i, (iou, track) in enumerate(zip(ious, player_tracks))
-        if iou > iou_threshold
-    ]
+    # Players with IoU above threshold, highest IoU first
+    associated = np.flatnonzero(ious > iou_threshold)
+    associated = associated[np.argsort(-ious[associated], kind='stable')]
     
-    if len(associated_players) >= 2:
-        # Sort by IoU score
-        associated_players.sort(key=lambda x: ious[x[0]], reverse=True)
-        return associated_players[0][1], associated_players[1][1]
-    elif len(associated_players) == 1:
-        return associated_players[0][1], None
+    if len(associated) >= 2:
+        return player_tracks[associated[0]]['id'], player_tracks[associated[1]]['id']
+    elif len(associated) == 1:
+        return player_tracks[associated[0]]['id'], None
     else:
         return None, None
 
@@ -74,22 +58,12 @@ def get_frame_at_timestamp(video_path: str, timestamp: float) -> Optional[np.nda
     Returns:
         np.ndarray: Frame at timestamp or None if failed
     """
-    cap = cv2.VideoCapture(video_path)
-    if not cap.isOpened():
+    # Shared open capture with keyframe-aware seeking instead of a fresh capture per call
+    reader = get_video_reader(video_path)
+    if not reader.is_opened():
         return None
-        
-    # Get video properties
-    fps = cap.get(cv2.CAP_PROP_FPS)
-    frame_idx = int(timestamp * fps)
-    
-    # Set frame position
-    cap.set(cv2.CAP_PROP_POS_FRAMES, frame_idx)
-    
-    # Read frame
-    success, frame = cap.read()
-    cap.release()
     
-    return frame if success else None
+    return reader.read(int(timestamp * reader.fps))
 
 def format_output_row(
     timestamp: float,
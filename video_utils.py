@@ -1,4 +1,13 @@
 import cv2
+import bisect
+import hashlib
+import os
+import shutil
+import subprocess
+import threading
+from collections import OrderedDict
+from profiling import profiler
+import numpy as np
 
 def parse_timestamp(ts):
     # Handles formats like "mm:ss.s" or "hh:mm:ss.s"
@@ -14,16 +23,333 @@ def parse_timestamp(ts):
         return float(ts)
 
 def get_frame_at_timestamp(video_path, timestamp):
-    cap = cv2.VideoCapture(video_path)
-    if not cap.isOpened():
+    # Served by the process-wide reader for this file, so repeated calls share
+    # one open capture and its keyframe index instead of reopening the video
+    reader = get_video_reader(video_path)
+    if not reader.is_opened():
         print(f"Error: Could not open video {video_path}")
         return None
-    fps = cap.get(cv2.CAP_PROP_FPS)
-    frame_idx = int(timestamp * fps)
-    cap.set(cv2.CAP_PROP_POS_FRAMES, frame_idx)
-    ret, frame = cap.read()
-    cap.release()
-    if not ret:
+    frame_idx = int(timestamp * reader.fps)
+    frame = reader.read(frame_idx)
+    if frame is None:
         print(f"Warning: Could not read frame at {timestamp}s (frame {frame_idx})")
         return None
-    return frame 
\ No newline at end of file
+    return frame
+
+def window_bounds(timestamp, fps, window=1.0):
+    # Inclusive frame range covering timestamp +/- window seconds
+    start = max(0, int((timestamp - window) * fps))
+    end = int((timestamp + window) * fps)
+    return start, end
+
+class FrameCache:
+    def __init__(self, max_frames=128):
+        """Bounded LRU cache of decoded frames keyed by frame index.
+
+        Args:
+            max_frames (int): Maximum number of frames kept in memory
+        """
+        self.max_frames = max_frames
+        self._frames = OrderedDict()
+
+    def get(self, frame_idx):
+        frame = self._frames.get(frame_idx)
+        if frame is not None:
+            self._frames.move_to_end(frame_idx)
+        return frame
+
+    def put(self, frame_idx, frame):
+        self._frames[frame_idx] = frame
+        self._frames.move_to_end(frame_idx)
+        while len(self._frames) > self.max_frames:
+            self._frames.popitem(last=False)
+
+    def clear(self):
+        self._frames.clear()
+
+    def __contains__(self, frame_idx):
+        return frame_idx in self._frames
+
+    def __len__(self):
+        return len(self._frames)
+
+class FrameRing:
+    def __init__(self, capacity=32):
+        """Fixed pool of preallocated frame buffers, one slot per frame index modulo capacity.
+
+        Frames are decoded straight into their slot, so streaming a window of
+        any length allocates nothing after the first frame. A returned frame is
+        a view that stays valid until `capacity` further frames are decoded.
+
+        Args:
+            capacity (int): Number of frames held
+        """
+        self.capacity = capacity
+        self.buffer = None
+        self.frame_ids = np.full(capacity, -1, dtype=np.int64)
+
+    def get(self, frame_idx):
+        slot = frame_idx % self.capacity
+        if self.buffer is not None and self.frame_ids[slot] == frame_idx:
+            return self.buffer[slot]
+        return None
+
+    def slot(self, frame_idx, shape):
+        """Claim the buffer for frame_idx; it holds no valid frame until commit()."""
+        if self.buffer is None or self.buffer.shape[1:] != shape:
+            self.buffer = np.empty((self.capacity,) + shape, dtype=np.uint8)
+            self.frame_ids[:] = -1
+        slot = frame_idx % self.capacity
+        self.frame_ids[slot] = -1
+        return self.buffer[slot]
+
+    def commit(self, frame_idx):
+        self.frame_ids[frame_idx % self.capacity] = frame_idx
+
+    def clear(self):
+        self.buffer = None
+        self.frame_ids[:] = -1
+
+class VideoFrameReader:
+    def __init__(self, video_path, cache_size=128, max_skip=250, keyframe_index_dir='.video_index', ring_size=32):
+        """Keep one capture open and walk the video forward, caching decoded frames.
+
+        Events should be requested in timestamp order: overlapping windows are
+        then served from the cache and gaps between windows are skipped with
+        grab() (no frame retrieval or colour conversion) instead of a fresh
+        seek and decode. With a keyframe index, a jump seeks straight to the
+        last keyframe before the target and grabs forward from there, so a
+        frame late in a long-GOP match costs about the same as one near the start.
+
+        Not thread-safe: use one reader per thread.
+
+        Args:
+            video_path (str): Path to video file
+            cache_size (int): Number of decoded frames kept for overlapping windows
+            max_skip (int): Largest forward gap grabbed through when there is no keyframe index
+            keyframe_index_dir (str): Where keyframe indices are cached, or None to not use one
+            ring_size (int): Preallocated frame buffers used by iter_window
+        """
+        self.video_path = video_path
+        self.cap = cv2.VideoCapture(video_path)
+        self.fps = self.cap.get(cv2.CAP_PROP_FPS) if self.cap.isOpened() else 0.0
+        self.cache = FrameCache(cache_size)
+        self.ring = FrameRing(ring_size)
+        self.max_skip = max_skip
+        self.position = 0  # Index of the frame the next cap.read() returns
+        self.keyframes = None
+        if keyframe_index_dir and self.is_opened():
+            self.keyframes = load_keyframe_index(video_path, self.fps, keyframe_index_dir)
+
+    def is_opened(self):
+        return self.cap.isOpened()
+
+    def _keyframe_before(self, frame_idx):
+        i = bisect.bisect_right(self.keyframes, frame_idx)
+        return self.keyframes[i - 1] if i else 0
+
+    def _seek(self, frame_idx):
+        if self.keyframes is not None:
+            keyframe = self._keyframe_before(frame_idx)
+            # Grabbing forward beats seeking unless a keyframe lies between here and the target
+            if not self.position <= frame_idx or keyframe > self.position:
+                self.cap.set(cv2.CAP_PROP_POS_FRAMES, keyframe)
+                self.position = keyframe
+        elif frame_idx < self.position or frame_idx - self.position > self.max_skip:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, frame_idx)
+            self.position = frame_idx
+            return True
+        while self.position < frame_idx:
+            if not self.cap.grab():
+                return False
+            self.position += 1
+        return True
+
+    def read(self, frame_idx):
+        """Get a single frame, from the cache when possible.
+
+        Args:
+            frame_idx (int): Frame index
+
+        Returns:
+            np.ndarray: Frame in BGR format or None if it could not be read
+        """
+        frame = self.cache.get(frame_idx)
+        if frame is not None:
+            return frame
+        if not self.is_opened() or not self._seek(frame_idx):
+            return None
+        ret, frame = self.cap.read()
+        if not ret:
+            return None
+        self.position += 1
+        self.cache.put(frame_idx, frame)
+        return frame
+
+    def read_window(self, start, end):
+        """Get the frames in the inclusive range [start, end].
+
+        Returns:
+            list: Frames in order, truncated at the first frame that fails to read
+        """
+        frames = []
+        for frame_idx in range(start, end + 1):
+            frame = self.read(frame_idx)
+            if frame is None:
+                break
+            frames.append(frame)
+        return frames
+
+    def iter_window(self, start, end):
+        """Stream the frames in the inclusive range [start, end] without materializing the window.
+
+        Frames are decoded into the reader's FrameRing instead of fresh arrays
+        and are not added to the frame cache, so memory stays at ring_size
+        frames however wide the window is. Each yielded frame is a view that is
+        overwritten ring_size frames later; copy anything needed for longer.
+
+        Yields:
+            tuple: (frame index, frame in BGR format), stopping at the first
+                frame that fails to read
+        """
+        shape = None
+        for frame_idx in range(start, end + 1):
+            frame = self.ring.get(frame_idx)
+            if frame is None:
+                frame = self.cache.get(frame_idx)
+            if frame is None:
+                if not self.is_opened():
+                    return
+                with profiler.span('decode', decode_frames=1):
+                    if not self._seek(frame_idx):
+                        return
+                    if shape is None:
+                        shape = self.frame_shape()
+                    slot = self.ring.slot(frame_idx, shape)
+                    ret, frame = self.cap.read(slot)
+                    if not ret:
+                        return
+                    self.position += 1
+                    if frame is slot:
+                        self.ring.commit(frame_idx)
+            yield frame_idx, frame
+
+    def frame_shape(self):
+        """Get the (height, width, 3) shape of decoded frames."""
+        return (int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT)), int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH)), 3)
+
+    def read_into(self, frame_idx, out):
+        """Decode a frame straight into a caller-owned buffer of frame_shape().
+
+        Returns:
+            bool: False if the frame could not be read
+        """
+        frame = self.ring.get(frame_idx)
+        if frame is None:
+            frame = self.cache.get(frame_idx)
+        if frame is not None:
+            np.copyto(out, frame)
+            return True
+        if not self.is_opened():
+            return False
+        with profiler.span('decode', decode_frames=1):
+            if not self._seek(frame_idx):
+                return False
+            ret, frame = self.cap.read(out)
+            if not ret:
+                return False
+            self.position += 1
+            if frame is not out:
+                np.copyto(out, frame)
+        return True
+
+    def release(self):
+        self.cap.release()
+        self.cache.clear()
+        self.ring.clear()
+
+def video_fingerprint(video_path, chunk_size=1 << 20):
+    """Cheap content fingerprint of a video file.
+
+    Hashes the file size plus its first and last chunk, which is enough to tell
+    re-encoded or replaced clips apart without reading a whole match from disk.
+    """
+    size = os.path.getsize(video_path)
+    digest = hashlib.sha1(str(size).encode())
+    with open(video_path, 'rb') as f:
+        digest.update(f.read(chunk_size))
+        if size > chunk_size:
+            f.seek(max(chunk_size, size - chunk_size))
+            digest.update(f.read(chunk_size))
+    return digest.hexdigest()
+
+def _probe_keyframes(video_path, fps, timeout=120):
+    # Keyframe packet timestamps from ffprobe; packets are read without decoding.
+    # A probe that runs past timeout seconds (a huge or still-growing file) is
+    # abandoned, and the reader works without a keyframe index.
+    ffprobe = shutil.which('ffprobe')
+    if ffprobe is None or not fps:
+        return None
+    try:
+        output = subprocess.run(
+            [ffprobe, '-v', 'error', '-select_streams', 'v:0',
+             '-show_entries', 'packet=pts_time,flags', '-of', 'csv=p=0', video_path],
+            capture_output=True, text=True, check=True, timeout=timeout
+        ).stdout
+    except subprocess.TimeoutExpired:
+        print(f"Warning: keyframe probe of {video_path} took over {timeout}s; seeking without a keyframe index")
+        return None
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    times = []
+    keyframe_times = []
+    for line in output.splitlines():
+        parts = line.split(',')
+        if len(parts) < 2 or parts[0] in ('', 'N/A'):
+            continue
+        pts = float(parts[0])
+        times.append(pts)
+        if 'K' in parts[1]:
+            keyframe_times.append(pts)
+    if not keyframe_times:
+        return None
+    start = min(times)
+    return sorted({int(round((pts - start) * fps)) for pts in keyframe_times})
+
+def load_keyframe_index(video_path, fps, index_dir='.video_index'):
+    """Get the sorted keyframe frame indices of a video, building and caching them on first use.
+
+    Returns:
+        list: Keyframe indices, or None if they could not be determined (no ffprobe)
+    """
+    path = os.path.join(index_dir, video_fingerprint(video_path) + '.npy')
+    if os.path.exists(path):
+        return np.load(path).tolist()
+    keyframes = _probe_keyframes(video_path, fps)
+    if keyframes is not None:
+        os.makedirs(index_dir, exist_ok=True)
+        np.save(path, np.array(keyframes, dtype=np.int64))
+    return keyframes
+
+_readers = {}
+_readers_lock = threading.Lock()
+
+def get_video_reader(video_path):
+    """Get the process-wide reader for a video, opening it on first use.
+
+    Keeps one capture (and its keyframe index) open for the whole run. Callers
+    on different threads should create their own VideoFrameReader instead.
+    """
+    with _readers_lock:
+        reader = _readers.get(video_path)
+        if reader is None:
+            reader = VideoFrameReader(video_path)
+            _readers[video_path] = reader
+        return reader
+
+def release_video_readers():
+    # Close every process-wide reader, e.g. between matches in a long-lived process
+    with _readers_lock:
+        for reader in _readers.values():
+            reader.release()
+        _readers.clear()